@@ -1,14 +1,46 @@
+import time
+STARTUP_STARTED = time.perf_counter()
 import os
 import sys
-import threading
-import requests
 import customtkinter as ctk
+import tkinter
 from tkinter import filedialog
-import pygame
-import time
 import shutil
 import json
-import replicate
+import argparse
+import multiprocessing
+from audio_buffer import AudioBuffer
+from http_transport import DEFAULT_CHUNK_SIZE
+from speech_engine import PARAMETER_CONFIG, MAX_TEXT_LENGTH, MODEL_NAME, SpeechEngine, build_params
+from synthesis_cache import SynthesisCache
+from long_text import synthesize_long_text
+from incremental import IncrementalSynthesizer, segment_text
+from request_scheduler import DEFAULT_INITIAL_CONCURRENCY, RequestScheduler
+from parameter_sweep import SWEEP_PARAMS, combo_label, expand_sweep, parse_values
+from job_queue import JOB_CANCELLED, JOB_DONE, JOB_FAILED, Job, JobQueue
+from streaming_player import STREAM_CHUNK_SIZE, StreamingPlayer
+from metrics import METRICS
+from log_pipeline import DEFAULT_FLUSH_MS, DEFAULT_MAX_BATCH, DEFAULT_MAX_LINES, LogQueue
+from audio_check import CHECK_INVALID, CHECK_SUSPECT, AudioCheckPool
+STARTUP_IMPORTS_DONE = time.perf_counter()
+
+LANGUAGE_INDEX_FILE = "lang_index.json"
+WAVEFORM_COLOR = "#3B8ED0"
+
+# pygame 在首次播放时才导入，音频设备也在那时才打开
+pygame = None
+
+def load_pygame():
+    global pygame
+    if pygame is None:
+        import pygame as pygame_module
+        pygame = pygame_module
+    if not pygame.mixer.get_init():
+        pygame.mixer.init()
+    return pygame
+
+def music_busy():
+    return pygame is not None and bool(pygame.mixer.get_init()) and pygame.mixer.music.get_busy()
 
 def resource_path(relative_path):
     try:
@@ -18,12 +50,22 @@ def resource_path(relative_path):
 
     return os.path.join(base_path, relative_path)
 
+def app_path(relative_path):
+    """需要长期保留的数据放在程序旁边；打包后 _MEIPASS 是每次启动都会删除的临时目录。"""
+    if getattr(sys, "frozen", False):
+        base_path = os.path.dirname(sys.executable)
+    else:
+        base_path = os.path.dirname(os.path.abspath(sys.argv[0]))
+    return os.path.join(base_path, relative_path)
+
 class LanguageManager:
-    def __init__(self, language_folder="langs", default_lang="en_US"):
+    def __init__(self, language_folder="langs", default_lang="en_US", index_path=None):
         self.language_folder = resource_path(language_folder)
+        self.index_path = index_path or app_path(LANGUAGE_INDEX_FILE)
         
         self.languages = {}
         self.current_lang_data = {}
+        self._loaded = {}
         self._discover_languages()
         
         default_display_name = "English"
@@ -33,20 +75,56 @@ class LanguageManager:
                 break
         self.set_language(default_display_name)
 
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get("folder") == os.path.abspath(self.language_folder):
+                return index.get("files", {})
+        except (OSError, ValueError, AttributeError):
+            pass
+        return {}
+
+    def _save_index(self, files):
+        tmp_path = f"{self.index_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"folder": os.path.abspath(self.language_folder), "files": files}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            print(f"警告: 无法写入语言索引 {self.index_path}: {e}")
+
     def _discover_languages(self):
+        # 索引按文件名记录 mtime/大小和显示名，只有新增或改动过的语言文件才需要重新解析
+        cached = self._load_index()
+        files = {}
         try:
-            for filename in os.listdir(self.language_folder):
-                if filename.endswith(".json"):
-                    lang_code = filename.split(".")[0]
-                    try:
-                        with open(os.path.join(self.language_folder, filename), 'r', encoding='utf-8') as f:
-                            display_name = json.load(f).get("language_display_name", lang_code)
-                            self.languages[display_name] = lang_code
-                    except (json.JSONDecodeError, KeyError) as e:
-                        print(f"警告: 无法解析语言文件 {filename}: {e}")
+            entries = [entry for entry in os.scandir(self.language_folder)
+                       if entry.name.endswith(".json") and entry.is_file()]
         except FileNotFoundError:
             print(f"错误：找不到语言文件夹 '{self.language_folder}'。")
             self.languages = {"English": "en_US"}
+            return
+
+        for entry in entries:
+            lang_code = entry.name.split(".")[0]
+            st = entry.stat()
+            record = cached.get(entry.name)
+            if record is None or record.get("mtime_ns") != st.st_mtime_ns or record.get("size") != st.st_size:
+                try:
+                    with open(entry.path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                except (json.JSONDecodeError, KeyError) as e:
+                    print(f"警告: 无法解析语言文件 {entry.name}: {e}")
+                    continue
+                self._loaded[lang_code] = data
+                record = {"mtime_ns": st.st_mtime_ns, "size": st.st_size,
+                          "display_name": data.get("language_display_name", lang_code)}
+            files[entry.name] = record
+            self.languages[record["display_name"]] = lang_code
+
+        if files != cached:
+            self._save_index(files)
 
     def get_available_languages(self):
         return list(self.languages.keys())
@@ -54,9 +132,14 @@ class LanguageManager:
     def set_language(self, lang_display_name):
         lang_code = self.languages.get(lang_display_name, "en_US")
         filepath = os.path.join(self.language_folder, f"{lang_code}.json")
+        if lang_code in self._loaded:
+            self.current_lang_data = self._loaded[lang_code]
+            print(f"已加载语言: {lang_display_name}")
+            return
         try:
             with open(filepath, 'r', encoding='utf-8') as f:
                 self.current_lang_data = json.load(f)
+                self._loaded[lang_code] = self.current_lang_data
                 print(f"已加载语言: {lang_display_name}")
         except FileNotFoundError:
             print(f"错误：找不到语言文件 '{filepath}'。")
@@ -68,26 +151,82 @@ class LanguageManager:
         return self.current_lang_data.get(key, default_value)
 
 
+class SweepWindow(ctk.CTkToplevel):
+    """参数矩阵：每个参数填入若干取值，去重后的组合并发合成，结果以可播放的网格显示。"""
+
+    GRID_COLUMNS = 3
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.app = app
+        lm = app.lang_manager
+        self.title(lm.get("sweep_window_title"))
+        self.geometry("820x600")
+        self.grid_columnconfigure(1, weight=1)
+        self.grid_rowconfigure(len(SWEEP_PARAMS) + 1, weight=1)
+
+        self.value_vars = {}
+        raw_values = app.collect_raw_values(require_custom_voice=False)
+        for row, param_id in enumerate(SWEEP_PARAMS):
+            ctk.CTkLabel(self, text=lm.get(f"param_{param_id}")).grid(row=row, column=0, padx=10, pady=5, sticky="w")
+            value = raw_values.get(param_id, "")
+            if isinstance(value, float):
+                value = f"{value:.2f}".rstrip("0").rstrip(".")
+            self.value_vars[param_id] = ctk.StringVar(value=str(value))
+            ctk.CTkEntry(self, textvariable=self.value_vars[param_id]).grid(row=row, column=1, padx=10, pady=5, sticky="ew")
+
+        control_row = len(SWEEP_PARAMS)
+        self.hint_label = ctk.CTkLabel(self, text=lm.get("sweep_hint"), text_color="gray", anchor="w")
+        self.hint_label.grid(row=control_row, column=0, columnspan=2, padx=10, pady=5, sticky="w")
+        self.run_button = ctk.CTkButton(self, text=lm.get("sweep_run_button"), command=self.run_sweep)
+        self.run_button.grid(row=control_row, column=2, padx=10, pady=5)
+
+        self.grid_frame = ctk.CTkScrollableFrame(self)
+        self.grid_frame.grid(row=control_row + 1, column=0, columnspan=3, padx=10, pady=(5, 10), sticky="nsew")
+        for column in range(self.GRID_COLUMNS):
+            self.grid_frame.grid_columnconfigure(column, weight=1)
+        self.cells = {}
+
+    def run_sweep(self):
+        sweep_values = {param_id: parse_values(var.get()) for param_id, var in self.value_vars.items()}
+        jobs = self.app.enqueue_sweep(sweep_values)
+        if not jobs:
+            return
+        for cell in self.cells.values():
+            cell["frame"].destroy()
+        self.cells = {}
+        for index, (label, job) in enumerate(jobs):
+            frame = ctk.CTkFrame(self.grid_frame)
+            frame.grid(row=index // self.GRID_COLUMNS, column=index % self.GRID_COLUMNS, padx=4, pady=4, sticky="nsew")
+            frame.grid_columnconfigure(0, weight=1)
+            ctk.CTkLabel(frame, text=label, anchor="w", wraplength=200, justify="left").grid(
+                row=0, column=0, columnspan=2, padx=6, pady=(4, 0), sticky="ew")
+            status = ctk.CTkLabel(frame, text="", text_color="gray", anchor="w")
+            status.grid(row=1, column=0, padx=6, pady=(0, 4), sticky="w")
+            play = ctk.CTkButton(frame, text="▶", width=32, state="disabled", command=lambda j=job: self.app.play_job(j))
+            play.grid(row=1, column=1, padx=6, pady=(0, 4))
+            self.cells[job.id] = {"frame": frame, "status": status, "play": play}
+            self.update_job(job)
+
+    def update_job(self, job):
+        cell = self.cells.get(job.id)
+        if cell is None:
+            return
+        cell["status"].configure(text=self.app.lang_manager.get(f"job_status_{job.status}"))
+        cell["play"].configure(state="normal" if job.status == JOB_DONE else "disabled")
+
+
 class SpeechApp(ctk.CTk):
     
-    PARAMETER_CONFIG = [
-        {"id": "voice_id",      "type": "combobox", "json_map": "voice_map"},
-        {"id": "speed",         "type": "slider",   "range": (0.5, 2.0), "steps": 30,  "default": 1.0},
-        {"id": "volume",        "type": "slider",   "range": (0.0, 10.0),"steps": 100, "default": 1.0},
-        {"id": "pitch",         "type": "slider",   "range": (-12, 12),  "steps": 24,  "default": 0},
-        {"id": "emotion",       "type": "combobox", "json_map": "emotion_map"},
-        {"id": "eng_norm",      "type": "checkbox", "default": False},
-        {"id": "advanced_sep",  "type": "separator"},
-        {"id": "bitrate",       "type": "combobox", "options": ["32000", "64000", "128000", "256000"], "default": "128000"},
-        {"id": "sample_rate",   "type": "combobox", "options": ["8000", "16000", "22050", "24000", "32000", "44100"], "default": "32000"},
-        {"id": "channel",       "type": "combobox", "json_map": "channel_map"},
-        {"id": "lang_boost",    "type": "combobox", "json_map": "language_boost_map"},
-    ]
-
-    def __init__(self):
+    PARAMETER_CONFIG = PARAMETER_CONFIG
+
+    def __init__(self, log_file=None, metrics_jsonl=None):
         super().__init__()
         
-        self.lang_manager = LanguageManager()
+        self.log_queue = LogQueue(file_path=log_file)
+        self.closing = False
+        with METRICS.timer("startup_languages"):
+            self.lang_manager = LanguageManager()
 
         ctk.set_appearance_mode("System")
         ctk.set_default_color_theme("blue")
@@ -100,8 +239,24 @@ class SpeechApp(ctk.CTk):
             print(f"设置图标失败: {e}")
 
 
-        pygame.mixer.init()
-        self.temp_audio_path = None
+        self.current_audio = None
+        self.current_job = None
+        self.last_synthesis = None
+        self.stream_player = None
+        self.request_scheduler = RequestScheduler()
+        # 任务数不超过调度器的初始并发，多出来的任务保持“排队”状态，取消时不会占着线程
+        self.job_queue = JobQueue(self.run_job, max_workers=DEFAULT_INITIAL_CONCURRENCY, on_update=self.on_job_update)
+        self.sweep_window = None
+        self.preview_job = None
+        # 解码校验和波形摘要在子进程里计算，进程池在第一个任务完成时才启动
+        self.audio_checker = AudioCheckPool()
+        self.job_rows = {}
+        # metrics.prom 每次覆盖写；逐条记录的 JSONL 会一直增长，只在 --metrics-jsonl 指定时才写
+        self.metrics_prom_path = app_path(os.path.join("metrics", "metrics.prom"))
+        if metrics_jsonl:
+            METRICS.set_jsonl_path(metrics_jsonl)
+        self.incremental = IncrementalSynthesizer()
+        self.synthesis_cache = SynthesisCache(app_path("synthesis_cache"), model_name=MODEL_NAME)
         self.placeholder_color = 'gray50'
         self.default_text_color = None
 
@@ -112,10 +267,19 @@ class SpeechApp(ctk.CTk):
         self.param_widgets = {}
         self.param_vars = {}
         self.custom_voice_id_var = ctk.StringVar(value="")
-
-        self.create_main_layout()
-        self.create_widgets()
-        self.update_ui_language()
+        self.long_text_var = ctk.BooleanVar(value=False)
+        self.incremental_var = ctk.BooleanVar(value=False)
+        self.preview_var = ctk.BooleanVar(value=False)
+        self.stream_playback_var = ctk.BooleanVar(value=False)
+        self.post_normalize_var = ctk.StringVar(value="")
+        self.post_trim_var = ctk.BooleanVar(value=False)
+        self.post_fade_var = ctk.BooleanVar(value=False)
+
+        with METRICS.timer("startup_widgets"):
+            self.create_main_layout()
+            self.create_widgets()
+            self.update_ui_language()
+        self.flush_log()
 
     def create_main_layout(self):
         self.left_frame = ctk.CTkFrame(self, corner_radius=10)
@@ -148,6 +312,7 @@ class SpeechApp(ctk.CTk):
         self.params_frame.pack(pady=10, padx=10, fill="both", expand=True)
         self.params_frame.grid_columnconfigure(1, weight=1)
         self.create_parameter_controls(self.params_frame)
+        self.custom_voice_id_var.trace_add("write", self.on_param_change)
 
         lang_frame = ctk.CTkFrame(self.right_frame)
         lang_frame.pack(pady=(10, 0), padx=10, fill="x")
@@ -161,8 +326,28 @@ class SpeechApp(ctk.CTk):
                                          command=self.on_language_change)
         self.lang_menu.pack(side="left", expand=True, fill="x", padx=(0, 10))
 
-        self.generate_button = ctk.CTkButton(self.right_frame, text="", command=self.start_generation_thread, height=40, font=ctk.CTkFont(size=16, weight="bold"))
+        self.long_text_checkbox = ctk.CTkCheckBox(self.right_frame, text="", variable=self.long_text_var)
+        self.long_text_checkbox.pack(pady=(10, 0), padx=10, anchor="w")
+        self.incremental_checkbox = ctk.CTkCheckBox(self.right_frame, text="", variable=self.incremental_var)
+        self.incremental_checkbox.pack(pady=(10, 0), padx=10, anchor="w")
+        self.preview_checkbox = ctk.CTkCheckBox(self.right_frame, text="", variable=self.preview_var)
+        self.preview_checkbox.pack(pady=(10, 0), padx=10, anchor="w")
+        self.stream_playback_checkbox = ctk.CTkCheckBox(self.right_frame, text="", variable=self.stream_playback_var)
+        self.stream_playback_checkbox.pack(pady=(10, 0), padx=10, anchor="w")
+
+        self.generate_button = ctk.CTkButton(self.right_frame, text="", command=self.enqueue_generation, height=40, font=ctk.CTkFont(size=16, weight="bold"))
         self.generate_button.pack(pady=10, padx=10, fill="x")
+        self.sweep_button = ctk.CTkButton(self.right_frame, text="", command=self.open_sweep_window, fg_color="transparent", border_width=1)
+        self.sweep_button.pack(pady=(0, 10), padx=10, fill="x")
+
+        self.jobs_header = ctk.CTkFrame(self.right_frame, fg_color="transparent")
+        self.jobs_header.pack(padx=10, pady=(10, 0), fill="x")
+        self.jobs_label = ctk.CTkLabel(self.jobs_header, text="", font=ctk.CTkFont(weight="bold"))
+        self.jobs_label.pack(side="left")
+        self.clear_jobs_button = ctk.CTkButton(self.jobs_header, text="", width=90, height=24, command=self.clear_finished_jobs, fg_color="transparent", border_width=1)
+        self.clear_jobs_button.pack(side="right")
+        self.jobs_frame = ctk.CTkScrollableFrame(self.right_frame, height=140, corner_radius=8)
+        self.jobs_frame.pack(pady=(5, 0), padx=10, fill="x")
 
         self.log_label = ctk.CTkLabel(self.right_frame, text="", font=ctk.CTkFont(weight="bold"))
         self.log_label.pack(padx=10, pady=(10, 0), anchor="w")
@@ -176,6 +361,22 @@ class SpeechApp(ctk.CTk):
         self.play_button.grid(row=0, column=0, padx=(0, 5), sticky="ew")
         self.save_button = ctk.CTkButton(self.audio_control_frame, text="", command=self.save_audio, state="disabled")
         self.save_button.grid(row=0, column=1, padx=(5, 0), sticky="ew")
+        self.audiobook_button = ctk.CTkButton(self.audio_control_frame, text="", command=self.export_audiobook, fg_color="transparent", border_width=1)
+        self.audiobook_button.grid(row=1, column=0, columnspan=2, pady=(10, 0), sticky="ew")
+
+        self.post_frame = ctk.CTkFrame(self.right_frame)
+        self.post_frame.pack(pady=(0, 10), padx=10, fill="x")
+        self.post_frame.grid_columnconfigure(0, weight=1)
+        self.post_label = ctk.CTkLabel(self.post_frame, text="")
+        self.post_label.grid(row=0, column=0, columnspan=4, padx=10, pady=(5, 0), sticky="w")
+        self.post_normalize_menu = ctk.CTkComboBox(self.post_frame, values=[], variable=self.post_normalize_var)
+        self.post_normalize_menu.grid(row=1, column=0, padx=(10, 5), pady=5, sticky="ew")
+        self.post_trim_checkbox = ctk.CTkCheckBox(self.post_frame, text="", variable=self.post_trim_var)
+        self.post_trim_checkbox.grid(row=1, column=1, padx=5, pady=5)
+        self.post_fade_checkbox = ctk.CTkCheckBox(self.post_frame, text="", variable=self.post_fade_var)
+        self.post_fade_checkbox.grid(row=1, column=2, padx=5, pady=5)
+        self.post_apply_button = ctk.CTkButton(self.post_frame, text="", width=80, command=self.enqueue_postprocess)
+        self.post_apply_button.grid(row=1, column=3, padx=(5, 10), pady=5)
 
     def create_parameter_controls(self, parent_frame):
         row_counter = 0
@@ -189,6 +390,7 @@ class SpeechApp(ctk.CTk):
                 self.param_vars[param_id] = ctk.BooleanVar(value=config.get("default", False))
             else:
                 self.param_vars[param_id] = ctk.StringVar(value=config.get("default", ""))
+            self.param_vars[param_id].trace_add("write", self.on_param_change)
 
             label = ctk.CTkLabel(parent_frame, text="")
             self.param_widgets[param_id] = {'label': label}
@@ -251,6 +453,11 @@ class SpeechApp(ctk.CTk):
             self.custom_voice_id_var.set("") 
 
 
+    def on_param_change(self, *args):
+        # 参数变了，正在进行的首句试听已经没有意义
+        if self.preview_job is not None:
+            self.cancel_preview()
+
     def on_language_change(self, choice):
         self.lang_manager.set_language(choice)
         self.update_ui_language()
@@ -292,10 +499,28 @@ class SpeechApp(ctk.CTk):
 
 
         self.lang_label.configure(text=lm.get("language_label"))
+        self.long_text_checkbox.configure(text=lm.get("long_text_mode"))
+        self.incremental_checkbox.configure(text=lm.get("incremental_mode"))
+        self.preview_checkbox.configure(text=lm.get("preview_mode"))
+        self.stream_playback_checkbox.configure(text=lm.get("stream_playback_mode"))
         self.generate_button.configure(text=lm.get("generate_button"))
+        self.sweep_button.configure(text=lm.get("sweep_button"))
+        self.jobs_label.configure(text=lm.get("job_queue_label"))
+        self.clear_jobs_button.configure(text=lm.get("clear_jobs_button"))
+        for job in list(self.job_queue.jobs.values()):
+            self.update_job_row(job)
         self.log_label.configure(text=lm.get("log_label"))
         self.play_button.configure(text=lm.get("play_button"))
         self.save_button.configure(text=lm.get("save_button"))
+        self.audiobook_button.configure(text=lm.get("audiobook_button"))
+        self.post_label.configure(text=lm.get("post_label"))
+        self.post_trim_checkbox.configure(text=lm.get("post_trim"))
+        self.post_fade_checkbox.configure(text=lm.get("post_fade"))
+        self.post_apply_button.configure(text=lm.get("post_apply_button"))
+        normalize_options = list(lm.get("normalize_map", {}).keys())
+        self.post_normalize_menu.configure(values=normalize_options)
+        if normalize_options and self.post_normalize_var.get() not in normalize_options:
+            self.post_normalize_var.set(normalize_options[0])
         
         self.log_textbox.configure(state="normal")
         self.log_textbox.delete("1.0", "end")
@@ -317,144 +542,510 @@ class SpeechApp(ctk.CTk):
             self.text_input.configure(text_color=self.placeholder_color)
 
     def log_message(self, message):
-        def _update_log():
+        # 可在任意线程调用，实际显示由 flush_log 在界面线程中批量完成
+        self.log_queue.put(message)
+
+    def call_in_ui(self, callback):
+        """工作线程通过它切回界面线程；窗口关闭后直接丢弃。"""
+        if self.closing:
+            return
+        try:
+            self.after(0, callback)
+        except (RuntimeError, tkinter.TclError):
+            pass
+
+    def flush_log(self):
+        lines, dropped = self.log_queue.drain(DEFAULT_MAX_BATCH)
+        if dropped:
+            lines.insert(0, f"... {self.lang_manager.get('log_lines_dropped')}: {dropped}")
+        if lines:
             self.log_textbox.configure(state="normal")
-            timestamp = time.strftime("%H:%M:%S", time.localtime())
-            self.log_textbox.insert("end", f"[{timestamp}] {message}\n")
+            self.log_textbox.insert("end", "\n".join(lines) + "\n")
+            line_count = int(self.log_textbox.index("end-1c").split(".")[0]) - 1
+            if line_count > DEFAULT_MAX_LINES:
+                self.log_textbox.delete("1.0", f"{line_count - DEFAULT_MAX_LINES + 1}.0")
             self.log_textbox.see("end")
             self.log_textbox.configure(state="disabled")
-        self.after(0, _update_log)
-
-    def set_ui_state(self, is_generating):
-        state = "disabled" if is_generating else "normal"
-        self.generate_button.configure(state=state, text=self.lang_manager.get("generating_button") if is_generating else self.lang_manager.get("generate_button"))
-        self.lang_menu.configure(state=state)
-
-        for param_id, widgets in self.param_widgets.items():
-            if 'control' in widgets: 
-                widgets['control'].configure(state=state)
-        
-        if "voice_custom_option" in self.lang_manager.current_lang_data and self.param_vars["voice_id"].get() == self.lang_manager.get("voice_custom_option"):
-            self.custom_voice_id_entry.configure(state=state)
-        else:
-            self.custom_voice_id_entry.configure(state="disabled")
+        self.after(DEFAULT_FLUSH_MS, self.flush_log)
 
+    def collect_params(self):
+        lm = self.lang_manager
+        api_key = self.api_key_entry.get()
+        if not api_key: raise ValueError(lm.get("error_no_api_key"))
 
-        self.api_key_entry.configure(state=state)
-        self.text_input.configure(state=state)
+        text_content = self.text_input.get("1.0", "end-1c")
+        if text_content.strip() == lm.get("text_input_placeholder") or not text_content.strip():
+            raise ValueError(lm.get("error_no_text"))
+        if len(text_content) > MAX_TEXT_LENGTH and not (self.long_text_var.get() or self.incremental_var.get()):
+            raise ValueError(f"{lm.get('error_text_too_long')} ({len(text_content)}/{MAX_TEXT_LENGTH})！")
 
-        if is_generating:
-            self.play_button.configure(state="disabled")
-            self.save_button.configure(state="disabled")
+        return api_key, build_params(text_content, self.collect_raw_values(), lm.current_lang_data)
 
-    def start_generation_thread(self):
+    def collect_raw_values(self, require_custom_voice=True):
         lm = self.lang_manager
-        if self.temp_audio_path and os.path.exists(self.temp_audio_path):
-            try:
-                pygame.mixer.music.unload()
-                time.sleep(0.1)
-                os.remove(self.temp_audio_path)
-                self.temp_audio_path = None
-                self.log_message(lm.get("log_cleaned_temp"))
-            except Exception as e:
-                self.log_message(f"{lm.get('log_clean_failed')}: {e}")
-        
-        self.set_ui_state(True)
-        self.log_message(lm.get("log_task_start"))
-        
-        threading.Thread(target=self.run_generation, daemon=True).start()
-
-    def run_generation(self):
+        raw_values = {}
+        for config in self.PARAMETER_CONFIG:
+            param_id = config["id"]
+            if config["type"] == "separator":
+                continue
+            raw_value = self.param_vars[param_id].get()
+            if param_id == "voice_id" and "voice_custom_option" in lm.current_lang_data and raw_value == lm.get("voice_custom_option"):
+                raw_value = self.custom_voice_id_var.get().strip()
+                if not raw_value and require_custom_voice:
+                    raise ValueError(lm.get("error_custom_voice_id_empty"))
+            raw_values[param_id] = raw_value
+        return raw_values
+
+    def open_sweep_window(self):
+        if self.sweep_window is None or not self.sweep_window.winfo_exists():
+            self.sweep_window = SweepWindow(self)
+        self.sweep_window.focus()
+
+    def enqueue_sweep(self, sweep_values):
+        lm = self.lang_manager
+        try:
+            api_key, params = self.collect_params()
+            combos = expand_sweep(params["text"], self.collect_raw_values(), sweep_values, lm.current_lang_data)
+        except ValueError as e:
+            self.log_message(f"{lm.get('error_generic')}: {str(e)}")
+            return []
+
+        total = 1
+        for values in sweep_values.values():
+            total *= max(1, len(values))
+        self.log_message(f"{lm.get('log_sweep_started')}: {len(combos)}/{total}")
+        jobs = []
+        for combo in combos:
+            job = self.create_job(combo["params"], {"api_key": api_key, "sweep": True})
+            jobs.append((combo_label(combo["values"]), job))
+            self.job_queue.submit(job)
+        return jobs
+
+    def enqueue_generation(self):
         lm = self.lang_manager
         try:
-            api_key = self.api_key_entry.get()
-            if not api_key: raise ValueError(lm.get("error_no_api_key"))
-            
-            text_content = self.text_input.get("1.0", "end-1c")
-            if text_content.strip() == lm.get("text_input_placeholder") or not text_content.strip():
-                raise ValueError(lm.get("error_no_text"))
-            if len(text_content) > 5000:
-                raise ValueError(f"{lm.get('error_text_too_long')} ({len(text_content)}/5000)！")
-
-            os.environ["REPLICATE_API_TOKEN"] = api_key
-            
             self.log_message(lm.get("log_collecting_params"))
-            
-            params = {"text": text_content}
-            for config in self.PARAMETER_CONFIG:
-                param_id = config["id"]
-                if config["type"] == "separator":
-                    continue
-
-                raw_value = self.param_vars[param_id].get()
-
-                if param_id == 'eng_norm':
-                    api_param_id = 'english_normalization'
-                elif param_id == 'lang_boost':
-                    api_param_id = 'language_boost'
-                else:
-                    api_param_id = param_id
-
-                if config["type"] == "checkbox":
-                    params[api_param_id] = raw_value
-                elif config["type"] == "slider":
-                    params[api_param_id] = int(raw_value) if param_id == "pitch" else raw_value
-                elif config["type"] == "combobox":
-                    if param_id == "voice_id" and "voice_custom_option" in lm.current_lang_data:
-                        if raw_value == lm.get("voice_custom_option"):
-                            custom_id = self.custom_voice_id_var.get().strip()
-                            if not custom_id:
-                                raise ValueError(lm.get("error_custom_voice_id_empty"))
-                            params[api_param_id] = custom_id
-                        else:
-                            json_key = config["json_map"]
-                            options_map = lm.get(json_key, {})
-                            params[api_param_id] = options_map.get(raw_value, raw_value)
-                    else: 
-                        if "json_map" in config:
-                            json_key = config["json_map"]
-                            options_map = lm.get(json_key, {})
-                            params[api_param_id] = options_map.get(raw_value, raw_value)
-                        else:
-                            params[api_param_id] = int(raw_value) if raw_value.isdigit() else raw_value
-            
-            final_voice_id = params.get('voice_id', 'N/A')
-            self.log_message(f"{lm.get('log_using_voice')}: {final_voice_id}")
-            if 'language_boost' in params and params['language_boost'] != 'None':
-                 self.log_message(f"Using language boost: {params['language_boost']}")
-
-            self.log_message(lm.get("log_calling_api"))
-            output_url = replicate.run("minimax/speech-02-hd", input=params)
-            self.log_message(lm.get("log_api_success"))
-
-            response = requests.get(output_url, stream=True)
-            response.raise_for_status()
-
-            temp_dir = os.path.join(os.path.dirname(resource_path('.')), "temp_audio")
-            os.makedirs(temp_dir, exist_ok=True)
-            self.temp_audio_path = os.path.join(temp_dir, "temp_output.mp3")
-
-            with open(self.temp_audio_path, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192): f.write(chunk)
-            self.log_message(lm.get("log_download_complete"))
-
-            self.after(0, lambda: self.play_button.configure(state="normal"))
-            self.after(0, lambda: self.save_button.configure(state="normal"))
-
-        except Exception as e:
+            with METRICS.timer("collect_params"):
+                api_key, params = self.collect_params()
+        except ValueError as e:
             self.log_message(f"{lm.get('error_generic')}: {str(e)}")
+            return
+
+        last = self.last_synthesis
+        if last is not None and last.result is not None and last.params.get("volume") and \
+                params.get("volume") != last.params["volume"] and \
+                {k: v for k, v in params.items() if k != "volume"} == {k: v for k, v in last.params.items() if k != "volume"}:
+            # 只调增益；归一化会把音量改动抵消掉，后期处理仍然只在点“应用”时生效
+            job = self.create_job(params, {
+                "source": last.result,
+                "gain": params["volume"] / last.params["volume"],
+            }, "wav")
+            self.log_message(f"[#{job.id}] {lm.get('log_volume_local')}")
+            self.job_queue.submit(job)
+            return
+
+        job = self.create_job(params, {
+            "api_key": api_key,
+            "long_text": self.long_text_var.get(),
+            "incremental": self.incremental_var.get(),
+            "stream": self.stream_playback_var.get(),
+        })
+
+        self.log_message(f"[#{job.id}] {lm.get('log_task_start')}")
+        self.log_message(f"[#{job.id}] {lm.get('log_using_voice')}: {params.get('voice_id', 'N/A')}")
+        if 'language_boost' in params and params['language_boost'] != 'None':
+             self.log_message(f"[#{job.id}] Using language boost: {params['language_boost']}")
+        if self.preview_var.get() and not job.options["stream"]:
+            self.enqueue_preview(job)
+        self.job_queue.submit(job)
+
+    def enqueue_preview(self, full_job):
+        """把第一句作为单独的优先请求提交，到达后立即播放；增量模式下这句的音频会直接用于完整结果。"""
+        self.cancel_preview()
+        segments = segment_text(full_job.params["text"])
+        if len(segments) < 2:
+            return None
+        job = self.create_job(dict(full_job.params, text=segments[0]), {
+            "api_key": full_job.options["api_key"],
+            "preview": True,
+            "for_job": full_job.id,
+            "incremental": full_job.options.get("incremental"),
+        })
+        self.preview_job = job
+        self.log_message(f"[#{job.id}] {self.lang_manager.get('log_preview_started')}")
+        self.job_queue.submit(job)
+        return job
+
+    def cancel_preview(self):
+        job, self.preview_job = self.preview_job, None
+        if job is not None and not job.finished:
+            self.job_queue.cancel(job.id)
+
+    def play_preview(self, job):
+        if job is not self.preview_job:
+            return
+        self.preview_job = None
+        latency = time.time() - job.created
+        METRICS.observe("first_audio", latency)
+        self.log_message(f"[#{job.id}] {self.lang_manager.get('log_preview_ready')}: {latency:.2f}s")
+        if self.stream_player is None and not music_busy():
+            self.play_job(job)
+
+    def create_job(self, params, options, extension="mp3"):
+        temp_dir = os.path.join(os.path.dirname(resource_path('.')), "temp_audio")
+        os.makedirs(temp_dir, exist_ok=True)
+        job_id = self.job_queue.next_id()
+        return Job(job_id, params, os.path.join(temp_dir, f"job_{job_id:04d}.{extension}"), options)
+
+    def get_post_settings(self):
+        from audio_dsp import DEFAULT_FADE_MS
+        normalize = self.lang_manager.get("normalize_map", {}).get(self.post_normalize_var.get(), "off")
+        fade_ms = DEFAULT_FADE_MS if self.post_fade_var.get() else 0
+        return {
+            "normalize": None if normalize == "off" else normalize,
+            "trim": self.post_trim_var.get(),
+            "fade_in_ms": fade_ms,
+            "fade_out_ms": fade_ms,
+        }
+
+    def enqueue_postprocess(self):
+        lm = self.lang_manager
+        source_job = self.current_job
+        if source_job is None or source_job.result is None:
+            self.log_message(lm.get("error_no_audio_file"))
+            return
+        job = self.create_job(source_job.params, {
+            "source": source_job.options.get("source", source_job.result),
+            "gain": source_job.options.get("gain", 1.0),
+            "post": self.get_post_settings(),
+        }, "wav")
+        self.log_message(f"[#{job.id}] {lm.get('log_task_start')}")
+        self.job_queue.submit(job)
+
+    def run_job(self, job, report_progress):
+        METRICS.observe("job_wait", time.time() - job.created, job=job.id)
+        buffer = AudioBuffer(spill_path=job.output_path)
+        try:
+            with METRICS.labels(job=job.id) as stages, METRICS.timer("job_total"):
+                self.synthesize_job(job, buffer, report_progress)
+        except BaseException:
+            buffer.close()
+            raise
         finally:
-            self.after(0, lambda: self.set_ui_state(False))
+            # 导出失败只记日志，不能影响任务本身的结果
+            try:
+                METRICS.write_prometheus(self.metrics_prom_path)
+            except OSError as e:
+                self.log_message(f"[#{job.id}] {self.lang_manager.get('log_metrics_failed')}: {e}")
+        timings = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in stages.items())
+        self.log_message(f"[#{job.id}] {self.lang_manager.get('log_stage_timings')}: {timings}")
+        buffer.finish()
+        if buffer.size:
+            self.check_audio(job, buffer)
+        return buffer
+
+    def check_audio(self, job, buffer):
+        if self.audio_checker.closed:
+            return
+        future = self.audio_checker.analyze(buffer.getvalue(), job.params.get("text"), job.params.get("speed", 1.0),
+                                            buffer.audio_format)
+
+        def _on_checked(f):
+            if not f.cancelled():
+                self.call_in_ui(lambda: self.on_audio_checked(job, f))
+
+        future.add_done_callback(_on_checked)
+
+    def on_audio_checked(self, job, future):
+        lm = self.lang_manager
+        try:
+            check = future.result()
+        except Exception as e:
+            check = {"status": CHECK_INVALID, "error": str(e), "peaks": []}
+        if check["status"] == CHECK_INVALID:
+            self.log_message(f"[#{job.id}] {lm.get('error_audio_invalid')}: {check['error']}")
+            # 损坏的结果不能留在缓存里，否则下次相同的请求还会拿到它
+            if "source" not in job.options:
+                self.synthesis_cache.discard(job.params)
+        elif check["status"] == CHECK_SUSPECT:
+            self.log_message(f"[#{job.id}] {lm.get('log_audio_suspect')}: {check['error']}")
+        self.draw_waveform(job, check.get("peaks"))
+
+    def draw_waveform(self, job, peaks):
+        """用波形摘要替换任务行里的进度条。"""
+        row = self.job_rows.get(job.id)
+        if row is None or not peaks:
+            return
+        background = row["frame"].cget("fg_color")
+        if isinstance(background, (list, tuple)):
+            background = background[1] if ctk.get_appearance_mode() == "Dark" else background[0]
+        canvas = ctk.CTkCanvas(row["frame"], height=16, highlightthickness=0, bg=background)
+        row["progress"].grid_remove()
+        canvas.grid(row=1, column=0, padx=5, pady=(0, 5), sticky="ew")
+        canvas.bind("<Configure>", lambda event: self.render_waveform(canvas, peaks))
+
+    def render_waveform(self, canvas, peaks):
+        canvas.delete("all")
+        width, height = canvas.winfo_width(), canvas.winfo_height()
+        middle = height / 2
+        for x in range(width):
+            low, high = peaks[x * len(peaks) // width]
+            canvas.create_line(x, middle - high * middle, x, middle - low * middle + 1, fill=WAVEFORM_COLOR)
+
+    def synthesize_job(self, job, buffer, report_progress):
+        lm = self.lang_manager
+        tag = f"[#{job.id}]"
+        params = job.params
+        audiobook = job.options.get("audiobook")
+        if audiobook is not None:
+            from audiobook import export_audiobook
+
+            def _on_exported(done, total):
+                job.check_cancelled()
+                report_progress(done / total)
+
+            dest = job.options["dest"]
+            marks = export_audiobook(audiobook, dest, sample_rate=job.options["sample_rate"],
+                                     channels=job.options["channels"], on_progress=_on_exported)
+            self.log_message(f"{tag} {lm.get('log_audiobook_done')}: {dest} ({len(marks)}, {marks[-1]['end']:.1f}s)")
+            return
+
+        source = job.options.get("source")
+        if source is not None:
+            import audio_dsp
+            samples, sample_rate = audio_dsp.decode(source.getvalue())
+            samples = audio_dsp.process(samples, sample_rate, gain=job.options.get("gain", 1.0), **job.options.get("post", {}))
+            buffer.audio_format = "wav"
+            buffer.write(audio_dsp.to_wav_bytes(samples, sample_rate))
+            self.log_message(f"{tag} {lm.get('log_postprocess_done')}")
+            return
+
+        api_key = job.options["api_key"]
+        if job.options.get("preview"):
+            engine = SpeechEngine(api_token=api_key, cache=self.synthesis_cache, scheduler=self.request_scheduler,
+                                  check_cancelled=job.check_cancelled)
+            if job.options.get("incremental"):
+                segment = self.incremental.synthesize_segment(engine, params, params["text"], priority=True)
+                buffer.write(segment.getvalue())
+            else:
+                engine.synthesize(params, buffer, priority=True)
+            job.check_cancelled()
+            return
+        elif job.options.get("incremental"):
+            engine = SpeechEngine(api_token=api_key, cache=self.synthesis_cache, scheduler=self.request_scheduler,
+                                  check_cancelled=job.check_cancelled)
+
+            def _on_segment_done(done, total):
+                job.check_cancelled()
+                report_progress(done / total)
+
+            stats = self.incremental.synthesize(engine, params, buffer, on_segment_done=_on_segment_done)
+            self.log_message(f"{tag} {lm.get('log_incremental')}: {stats['synthesized']}/{stats['segments']}")
+        elif job.options.get("long_text"):
+            engine = SpeechEngine(api_token=api_key, cache=self.synthesis_cache, scheduler=self.request_scheduler,
+                                  check_cancelled=job.check_cancelled)
+            self.log_message(f"{tag} {lm.get('log_calling_api')}")
+
+            def _on_chunk_done(done, total):
+                job.check_cancelled()
+                report_progress(done / total)
+                self.log_message(f"{tag} {lm.get('log_chunk_done')}: {done}/{total}")
+
+            synthesize_long_text(engine, params, buffer, workers=self.request_scheduler.max_concurrency,
+                                 on_chunk_done=_on_chunk_done)
+        elif self.synthesis_cache_fetch(params, buffer):
+            stats = self.synthesis_cache.stats()
+            self.log_message(f"{tag} {lm.get('log_cache_hit')} ({stats['hits']}/{stats['hits'] + stats['misses']})")
+            return
+        else:
+            stream = job.options.get("stream")
+            chunk_size = STREAM_CHUNK_SIZE if stream else DEFAULT_CHUNK_SIZE
+            engine = SpeechEngine(api_token=api_key, chunk_size=chunk_size, scheduler=self.request_scheduler,
+                                  check_cancelled=job.check_cancelled)
+            self.log_message(f"{tag} {lm.get('log_calling_api')}")
+            job.check_cancelled()
+            output_url = engine.call_api(params)
+            job.check_cancelled()
+            self.log_message(f"{tag} {lm.get('log_api_success')}")
+            report_progress(0.5)
+
+            player = StreamingPlayer() if stream else None
+            if player is not None:
+                self.call_in_ui(lambda: self.start_stream_playback(player))
+
+            def _on_chunk(chunk):
+                job.check_cancelled()
+                if player is not None:
+                    player.feed(chunk)
+
+            def _on_progress(written, total):
+                if total:
+                    report_progress(0.5 + 0.5 * written / total)
+
+            try:
+                engine.download(output_url, buffer, on_chunk=_on_chunk, on_progress=_on_progress)
+            finally:
+                if player is not None:
+                    player.finish()
+            with METRICS.timer("cache_write"):
+                self.synthesis_cache.put(params, buffer)
+        self.log_message(f"{tag} {lm.get('log_download_complete')}")
+
+    def synthesis_cache_fetch(self, params, buffer):
+        with METRICS.timer("cache_fetch"):
+            return self.synthesis_cache.fetch(params, buffer)
+
+    def on_job_update(self, job):
+        self.call_in_ui(lambda: self.update_job_row(job))
+
+    def update_job_row(self, job):
+        lm = self.lang_manager
+        if job.id not in self.job_queue.jobs:
+            return
+        row = self.job_rows.get(job.id)
+        if row is None:
+            frame = ctk.CTkFrame(self.jobs_frame)
+            frame.pack(fill="x", padx=5, pady=2)
+            frame.grid_columnconfigure(0, weight=1)
+            preview = " ".join(job.params.get("text", "").split())
+            title = ctk.CTkLabel(frame, text=f"#{job.id} {preview[:24]}", anchor="w")
+            title.grid(row=0, column=0, padx=5, sticky="ew")
+            status = ctk.CTkLabel(frame, text="", text_color="gray")
+            status.grid(row=0, column=1, columnspan=2, padx=5, sticky="e")
+            progress = ctk.CTkProgressBar(frame, height=8)
+            progress.grid(row=1, column=0, padx=5, pady=(0, 5), sticky="ew")
+            play = ctk.CTkButton(frame, text="▶", width=32, state="disabled", command=lambda: self.play_job(job))
+            play.grid(row=1, column=1, padx=(0, 5), pady=(0, 5))
+            cancel = ctk.CTkButton(frame, text="✕", width=32, command=lambda: self.job_queue.cancel(job.id))
+            cancel.grid(row=1, column=2, padx=(0, 5), pady=(0, 5))
+            row = {"frame": frame, "status": status, "progress": progress, "play": play, "cancel": cancel, "last_status": None}
+            self.job_rows[job.id] = row
+
+        if job.options.get("sweep") and self.sweep_window is not None and self.sweep_window.winfo_exists():
+            self.sweep_window.update_job(job)
+
+        row["status"].configure(text=lm.get(f"job_status_{job.status}"))
+        row["progress"].set(job.progress)
+        row["play"].configure(state="normal" if job.status == JOB_DONE and "audiobook" not in job.options else "disabled")
+        row["cancel"].configure(state="disabled" if job.finished else "normal")
+
+        if job.status == row["last_status"]:
+            return
+        row["last_status"] = job.status
+        if job.status == JOB_DONE:
+            if job.options.get("preview"):
+                self.play_preview(job)
+            elif "audiobook" not in job.options:
+                if self.preview_job is not None and self.preview_job.options["for_job"] == job.id:
+                    self.cancel_preview()
+                if "source" not in job.options:
+                    self.last_synthesis = job
+                if not job.options.get("sweep"):
+                    self.select_job(job)
+        elif job.status == JOB_FAILED:
+            self.log_message(f"[#{job.id}] {lm.get('error_generic')}: {job.error}")
+        elif job.status == JOB_CANCELLED:
+            self.log_message(f"[#{job.id}] {lm.get('job_status_cancelled')}")
+            if job.result is not None:
+                job.result.close()
+            if os.path.exists(job.output_path):
+                try:
+                    os.remove(job.output_path)
+                except Exception as e:
+                    self.log_message(f"{lm.get('log_clean_failed')}: {e}")
+
+    def clear_finished_jobs(self):
+        """移除已结束的任务并释放结果；选中的、可能被再次用到的和仍被其他任务引用的结果保留。"""
+        keep = {job.id for job in (self.current_job, self.last_synthesis, self.preview_job) if job is not None}
+        if self.sweep_window is not None and self.sweep_window.winfo_exists():
+            keep.update(self.sweep_window.cells)
+        in_use = set()
+        for job in list(self.job_queue.jobs.values()):
+            if not job.finished:
+                in_use.add(id(job.options.get("source")))
+                for chapter in job.options.get("audiobook") or ():
+                    in_use.update(id(segment) for segment in chapter["segments"])
+
+        removed = self.job_queue.remove_finished(keep)
+        for job in removed:
+            row = self.job_rows.pop(job.id, None)
+            if row is not None:
+                row["frame"].destroy()
+            if job.result is not None and id(job.result) not in in_use:
+                job.result.close()
+        self.log_message(f"{self.lang_manager.get('log_jobs_cleared')}: {len(removed)}")
+
+    def select_job(self, job):
+        self.current_job = job
+        self.current_audio = job.result
+        self.play_button.configure(state="normal")
+        self.save_button.configure(state="normal")
+
+    def play_job(self, job):
+        if self.stream_player is not None:
+            self.stream_player.stop()
+            self.stream_player = None
+        if music_busy():
+            pygame.mixer.music.stop(); pygame.mixer.music.unload()
+        self.select_job(job)
+        self.play_audio()
+
+    def start_stream_playback(self, player):
+        if self.stream_player is not None:
+            self.stream_player.stop()
+        try:
+            load_pygame()
+        except Exception as e:
+            self.log_message(f"{self.lang_manager.get('error_playback_failed')}: {e}")
+            player.stop()
+            return
+        if music_busy():
+            pygame.mixer.music.stop(); pygame.mixer.music.unload()
+        self.stream_player = player
+        self.play_button.configure(state="normal", text=self.lang_manager.get("stop_button"))
+        self.poll_stream_player(player)
+
+    def poll_stream_player(self, player):
+        if player is not self.stream_player:
+            return
+        lm = self.lang_manager
+        was_started = player.started
+        try:
+            active = player.poll()
+        except pygame.error as e:
+            self.log_message(f"{lm.get('error_playback_failed')}: {e}")
+            player.stop()
+            active = False
+        if player.started and not was_started:
+            self.log_message(lm.get("log_stream_started"))
+
+        if active:
+            self.after(50, lambda: self.poll_stream_player(player))
+        else:
+            self.stream_player = None
+            self.play_button.configure(text=lm.get("play_button"))
+            if player.started:
+                self.log_message(lm.get("log_playback_finished"))
 
     def play_audio(self):
         lm = self.lang_manager
-        if self.temp_audio_path and os.path.exists(self.temp_audio_path):
+        if self.stream_player is not None:
+            self.stream_player.stop()
+            self.stream_player = None
+            self.play_button.configure(text=lm.get("play_button"))
+            return
+        if self.current_audio is not None and self.current_audio.size:
+            try:
+                load_pygame()
+            except Exception as e:
+                self.log_message(f"{lm.get('error_playback_failed')}: {e}")
+                return
             try:
-                if pygame.mixer.music.get_busy():
+                if music_busy():
                     pygame.mixer.music.stop(); pygame.mixer.music.unload() 
                     self.play_button.configure(text=lm.get("play_button"))
                 else:
-                    pygame.mixer.music.load(self.temp_audio_path)
+                    pygame.mixer.music.load(self.current_audio.open_stream(), self.current_audio.audio_format)
                     pygame.mixer.music.play()
                     self.log_message(lm.get("log_playing"))
                     self.play_button.configure(text=lm.get("stop_button"))
@@ -465,7 +1056,7 @@ class SpeechApp(ctk.CTk):
             self.log_message(lm.get("error_no_audio_file"))
             
     def check_if_playing(self):
-        if pygame.mixer.music.get_busy():
+        if music_busy():
             self.after(100, self.check_if_playing)
         else:
             self.play_button.configure(text=self.lang_manager.get("play_button"))
@@ -473,37 +1064,103 @@ class SpeechApp(ctk.CTk):
 
     def save_audio(self):
         lm = self.lang_manager
-        if self.temp_audio_path and os.path.exists(self.temp_audio_path):
+        if self.current_audio is not None and self.current_audio.size:
+            audio_format = self.current_audio.audio_format
+            file_type = lm.get("file_dialog_type") if audio_format == "mp3" else lm.get("file_dialog_type_wav")
             save_path = filedialog.asksaveasfilename(
-                defaultextension=".mp3",
-                filetypes=[(lm.get("file_dialog_type"), "*.mp3")],
+                defaultextension=f".{audio_format}",
+                filetypes=[(file_type, f"*.{audio_format}")],
                 title=lm.get("file_dialog_title"),
-                initialfile="generated_speech.mp3"
+                initialfile=f"generated_speech.{audio_format}"
             )
             if save_path:
                 try:
-                    shutil.copy(self.temp_audio_path, save_path)
+                    self.current_audio.save(save_path)
                     self.log_message(f"{lm.get('log_save_success')}: {save_path}")
                 except Exception as e:
                     self.log_message(f"{lm.get('log_save_failed')}: {e}")
         else:
             self.log_message(lm.get("error_no_audio_file"))
 
+    def export_audiobook(self):
+        """把所有已完成的任务 (不含参数矩阵) 按编号顺序导出为一个有声书文件，每个任务一章。"""
+        lm = self.lang_manager
+        jobs = [job for job in list(self.job_queue.jobs.values())
+                if job.status == JOB_DONE and job.result is not None and job.result.size
+                and not job.options.get("sweep") and not job.options.get("preview") and "audiobook" not in job.options]
+        if not jobs:
+            self.log_message(lm.get("error_no_audio_file"))
+            return
+        audio_format = "mp3" if all(job.result.audio_format == "mp3" for job in jobs) else "wav"
+        file_types = [(lm.get("file_dialog_type"), "*.mp3"), (lm.get("file_dialog_type_wav"), "*.wav")]
+        if audio_format == "wav":
+            file_types.reverse()
+        save_path = filedialog.asksaveasfilename(
+            defaultextension=f".{audio_format}",
+            filetypes=file_types,
+            title=lm.get("file_dialog_title"),
+            initialfile=f"audiobook.{audio_format}"
+        )
+        if not save_path:
+            return
+
+        chapters = [{"title": " ".join(job.params.get("text", "").split())[:40], "segments": [job.result]} for job in jobs]
+        params = self.last_synthesis.params if self.last_synthesis is not None else jobs[-1].params
+        job = self.create_job({"text": os.path.basename(save_path)}, {
+            "audiobook": chapters,
+            "dest": save_path,
+            "sample_rate": params["sample_rate"],
+            "channels": 2 if params.get("channel") == "stereo" else 1,
+        })
+        self.log_message(f"[#{job.id}] {lm.get('log_audiobook_started')}: {len(chapters)}")
+        self.job_queue.submit(job)
+
     def on_closing(self):
         self.log_message(self.lang_manager.get("log_closing"))
+        self.closing = True
+        self.job_queue.shutdown()
+        self.audio_checker.shutdown(wait=False)
+        if self.stream_player is not None:
+            self.stream_player.stop()
+            self.stream_player = None
+        if pygame is not None:
+            pygame.mixer.quit()
+        METRICS.close()
+        self.log_queue.close()
+        for job in list(self.job_queue.jobs.values()):
+            if job.result is not None:
+                job.result.close()
         temp_dir = os.path.join(os.path.dirname(resource_path('.')), "temp_audio")
         if os.path.exists(temp_dir):
-            pygame.mixer.quit()
-            time.sleep(0.1)
             try:
                 shutil.rmtree(temp_dir, ignore_errors=True)
             except Exception as e:
                 print(f"关闭时删除临时目录失败: {e}")
-        else:
-             pygame.mixer.quit()
         self.destroy()
 
+def report_startup_time(app):
+    """--startup-time: 窗口首次绘制完成后打印各阶段耗时并退出。"""
+    app.update()
+    METRICS.observe("startup_imports", STARTUP_IMPORTS_DONE - STARTUP_STARTED)
+    METRICS.observe("startup_total", time.perf_counter() - STARTUP_STARTED)
+    for stage, row in METRICS.summary().items():
+        if stage.startswith("startup_"):
+            print(f"{stage:<20}{row['sum'] * 1000:>8.1f} ms")
+    app.on_closing()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Minimax Speech-02-HD 语音合成")
+    parser.add_argument("--startup-time", action="store_true", help="打印启动各阶段耗时后退出")
+    parser.add_argument("--log-file", help="同时把日志写入该文件 (按大小滚动)")
+    parser.add_argument("--metrics-jsonl", help="把每条耗时记录追加到该 JSONL 文件")
+    return parser.parse_known_args(argv)[0]
+
 if __name__ == "__main__":
-    app = SpeechApp()
+    # 打包后的程序里，校验进程池的子进程会重新执行本文件，freeze_support 让它们只做子进程的工作
+    multiprocessing.freeze_support()
+    args = parse_args()
+    app = SpeechApp(log_file=args.log_file, metrics_jsonl=args.metrics_jsonl)
     app.protocol("WM_DELETE_WINDOW", app.on_closing)
+    if args.startup_time:
+        app.after(0, lambda: report_startup_time(app))
     app.mainloop()
@@ -0,0 +1,123 @@
+import io
+import os
+import shutil
+import contextlib
+
+DEFAULT_SPILL_BYTES = 64 * 1024 * 1024
+
+
+def open_output(dest):
+    """dest 可以是路径，也可以是 AudioBuffer 等可写对象。"""
+    if hasattr(dest, "write"):
+        return contextlib.nullcontext(dest)
+    os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+    return open(dest, "wb")
+
+
+class AudioBuffer:
+    """内存中的音频结果，播放、保存和缓存共用同一份 bytes。
+
+    写入量超过 spill_threshold 且指定了 spill_path 时才转存到磁盘。
+    对下载代码来说它就是一个只能顺序写入的文件对象 (write/seek/truncate)。
+    """
+
+    def __init__(self, data=None, spill_path=None, spill_threshold=DEFAULT_SPILL_BYTES, audio_format="mp3"):
+        self.spill_path = spill_path
+        self.audio_format = audio_format
+        self.spill_threshold = spill_threshold
+        self._chunks = []
+        self._data = bytes(data) if data is not None else None
+        self._size = len(self._data) if data is not None else 0
+        self._file = None
+        self._pos = self._size
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def spilled(self):
+        return self._file is not None
+
+    def write(self, chunk):
+        if self._data is not None:
+            self._chunks = [self._data]
+            self._data = None
+        if self._file is None and self.spill_path and self._size + len(chunk) > self.spill_threshold:
+            self._spill()
+        if self._file is not None:
+            self._file.write(chunk)
+        else:
+            self._chunks.append(bytes(chunk))
+        self._size += len(chunk)
+        self._pos = self._size
+        return len(chunk)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self._pos = offset if whence == io.SEEK_SET else self._size + offset
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def truncate(self, size=None):
+        size = self._pos if size is None else size
+        if size != 0:
+            raise io.UnsupportedOperation("AudioBuffer can only be truncated to zero")
+        self._chunks = []
+        self._data = None
+        self._size = 0
+        self._pos = 0
+        if self._file is not None:
+            self._file.seek(0)
+            self._file.truncate()
+        return 0
+
+    def _spill(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.spill_path)), exist_ok=True)
+        self._file = open(self.spill_path, "w+b")
+        for chunk in self._chunks:
+            self._file.write(chunk)
+        self._chunks = []
+
+    def finish(self):
+        if self._file is not None:
+            self._file.flush()
+        elif self._data is None:
+            self._data = b"".join(self._chunks)
+            self._chunks = []
+        return self
+
+    def getvalue(self):
+        if self._file is not None:
+            self._file.flush()
+            with open(self.spill_path, "rb") as f:
+                return f.read()
+        return self.finish()._data
+
+    def open_stream(self):
+        if self._file is not None:
+            self._file.flush()
+            return open(self.spill_path, "rb")
+        return io.BytesIO(self.finish()._data)
+
+    def save(self, path):
+        if self._file is not None:
+            self._file.flush()
+            shutil.copyfile(self.spill_path, path)
+        else:
+            with open(path, "wb") as f:
+                f.write(self.finish()._data)
+        return path
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            try:
+                os.remove(self.spill_path)
+            except OSError:
+                pass
+        self._chunks = []
+        self._data = None
+        self._size = 0
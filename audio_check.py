@@ -0,0 +1,227 @@
+import io
+import os
+import sys
+import json
+import wave
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from mp3_utils import iter_audio_frames, parse_frame_header
+
+DEFAULT_PEAK_BUCKETS = 512
+CJK_SECONDS_PER_CHAR = 0.25
+OTHER_SECONDS_PER_CHAR = 0.065
+MIN_DURATION_RATIO = 0.3
+MAX_DURATION_RATIO = 3.0
+DURATION_SLACK_SECONDS = 1.5
+SILENCE_PEAK = 0.001
+PEAKS_SUFFIX = ".peaks.json"
+TRANSCODE_FORMATS = ("wav",)
+
+CHECK_OK = "ok"
+CHECK_SUSPECT = "suspect"
+CHECK_INVALID = "invalid"
+
+
+def _is_cjk(ch):
+    code = ord(ch)
+    return 0x3040 <= code <= 0x30FF or 0x3400 <= code <= 0x9FFF or 0xAC00 <= code <= 0xD7AF or 0xF900 <= code <= 0xFAFF
+
+
+def estimate_duration(text, speed=1.0):
+    """按字数粗略估计朗读时长 (秒)：中日韩文字按每字 0.25s，其余字母数字按每个 0.065s。"""
+    cjk = sum(1 for ch in text if _is_cjk(ch))
+    other = sum(1 for ch in text if ch.isalnum()) - cjk
+    return (cjk * CJK_SECONDS_PER_CHAR + other * OTHER_SECONDS_PER_CHAR) / max(float(speed or 1.0), 0.1)
+
+
+def mp3_structure(data):
+    """逐帧检查 MP3：返回 {"frames", "sample_rate", "channels", "duration", "truncated"}。"""
+    frames = 0
+    samples = 0
+    sample_rate = 0
+    channels = 0
+    end = 0
+    for offset, header in iter_audio_frames(data):
+        frames += 1
+        samples += header["samples"]
+        sample_rate = header["sample_rate"]
+        channels = header["channels"]
+        end = offset + header["length"]
+    # 最后一个完整帧之后还有一个有效帧头，说明这一帧只下载了一半
+    truncated = frames > 0 and parse_frame_header(data, end) is not None
+    return {
+        "frames": frames,
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "duration": samples / sample_rate if sample_rate else 0.0,
+        "truncated": truncated,
+    }
+
+
+def decode_native(data, sample_rate=None, channels=None):
+    """用 pygame 解码；指定 sample_rate/channels 时按原始格式初始化 mixer，避免再重采样一次。"""
+    import pygame
+    import audio_dsp
+
+    if sample_rate and channels:
+        current = pygame.mixer.get_init()
+        if current is None or current[0] != sample_rate or current[2] != channels:
+            pygame.mixer.quit()
+            pygame.mixer.init(frequency=sample_rate, channels=channels)
+    return audio_dsp.decode(data)
+
+
+def waveform_peaks(samples, buckets=DEFAULT_PEAK_BUCKETS):
+    """把波形压缩成 buckets 组 [最小值, 最大值]，界面按宽度取样绘制即可。"""
+    import numpy as np
+
+    n = samples.shape[0]
+    if n == 0 or buckets <= 0:
+        return []
+    mono = samples.mean(axis=1) if samples.ndim > 1 else samples
+    buckets = min(buckets, n)
+    edges = np.linspace(0, n, buckets + 1).astype(int)
+    lows = np.minimum.reduceat(mono, edges[:-1])
+    highs = np.maximum.reduceat(mono, edges[:-1])
+    return [[round(float(low), 4), round(float(high), 4)] for low, high in zip(lows, highs)]
+
+
+def analyze(data, text=None, speed=1.0, audio_format="mp3", buckets=DEFAULT_PEAK_BUCKETS, keep_samples=False):
+    """解码并校验一段音频，返回 {"status", "error", "duration", "peaks", ...}。
+
+    status 为 ok / suspect (能播放，但时长与文本不符或全是静音) / invalid (截断或无法解码)。
+    """
+    result = {"status": CHECK_OK, "error": None, "duration": None, "peaks": []}
+    sample_rate = channels = None
+    if audio_format == "mp3":
+        info = mp3_structure(data)
+        result.update(frames=info["frames"], duration=round(info["duration"], 3))
+        if not info["frames"]:
+            return dict(result, status=CHECK_INVALID, error="no MPEG audio frames")
+        if info["truncated"]:
+            return dict(result, status=CHECK_INVALID, error="last MPEG frame is truncated")
+        sample_rate, channels = info["sample_rate"], info["channels"]
+    elif audio_format == "wav":
+        try:
+            with wave.open(io.BytesIO(bytes(data))) as wav:
+                sample_rate, channels = wav.getframerate(), wav.getnchannels()
+        except (wave.Error, EOFError) as e:
+            return dict(result, status=CHECK_INVALID, error=f"bad WAV header: {e}")
+
+    try:
+        samples, decoded_rate = decode_native(data, sample_rate, channels)
+    except ImportError:
+        # 没有 pygame 时只做帧结构检查
+        return result
+    except Exception as e:
+        return dict(result, status=CHECK_INVALID, error=f"decode failed: {e}")
+    if result["duration"] is None:
+        result["duration"] = round(samples.shape[0] / decoded_rate, 3)
+    result["sample_rate"] = decoded_rate
+    result["peaks"] = waveform_peaks(samples, buckets)
+    if keep_samples:
+        result["samples"] = samples
+
+    if samples.size == 0 or float(abs(samples).max()) < SILENCE_PEAK:
+        return dict(result, status=CHECK_SUSPECT, error="audio is silent")
+    if text:
+        # 合成结果首尾通常带一点静音，上限额外放宽 DURATION_SLACK_SECONDS
+        expected = estimate_duration(text, speed)
+        duration = result["duration"]
+        too_short = duration < expected * MIN_DURATION_RATIO
+        too_long = duration > expected * MAX_DURATION_RATIO + DURATION_SLACK_SECONDS
+        if expected > 0 and (too_short or too_long):
+            return dict(result, status=CHECK_SUSPECT, error=f"duration {duration:.1f}s, expected about {expected:.1f}s")
+    return result
+
+
+def check_file(path, text=None, speed=1.0, buckets=DEFAULT_PEAK_BUCKETS, transcode=None):
+    """校验已写入磁盘的结果：波形摘要写到 <name>.peaks.json，transcode="wav" 时另存一份 WAV。"""
+    import audio_dsp
+
+    with open(path, "rb") as f:
+        data = f.read()
+    audio_format = os.path.splitext(path)[1].lstrip(".").lower() or "mp3"
+    result = analyze(data, text, speed, audio_format, buckets, keep_samples=bool(transcode))
+    samples = result.pop("samples", None)
+    base = os.path.splitext(path)[0]
+    if result["peaks"]:
+        with open(base + PEAKS_SUFFIX, "w", encoding="utf-8") as f:
+            json.dump({"duration": result["duration"], "peaks": result["peaks"]}, f, separators=(",", ":"))
+        result["peaks_path"] = base + PEAKS_SUFFIX
+    del result["peaks"]
+    if transcode == "wav" and samples is not None and result["status"] != CHECK_INVALID:
+        with open(base + ".wav", "wb") as f:
+            f.write(audio_dsp.to_wav_bytes(samples, result["sample_rate"]))
+        result["transcoded"] = base + ".wav"
+    return result
+
+
+def _init_worker():
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+
+class AudioCheckPool:
+    """在进程池里解码、校验和转码，充分利用多核，也不占用界面线程和下载线程。
+
+    进程池在第一次提交时才启动；使用 spawn 方式创建子进程，避免在有下载线程的进程里 fork。
+    """
+
+    def __init__(self, workers=None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.closed = False
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        # 多个下载线程可能同时提交第一个任务，只能创建一个进程池
+        with self._lock:
+            if self.closed:
+                raise RuntimeError("AudioCheckPool is shut down")
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def check_file(self, path, text=None, speed=1.0, buckets=DEFAULT_PEAK_BUCKETS, transcode=None):
+        return self._pool().submit(check_file, path, text, speed, buckets, transcode)
+
+    def analyze(self, data, text=None, speed=1.0, audio_format="mp3", buckets=DEFAULT_PEAK_BUCKETS):
+        return self._pool().submit(analyze, bytes(data), text, speed, audio_format, buckets)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            self.closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="校验已生成的音频文件并生成波形摘要")
+    parser.add_argument("files", nargs="+", help="MP3/WAV 文件")
+    parser.add_argument("-j", "--jobs", type=int, help="进程数，默认等于 CPU 核数")
+    parser.add_argument("--peaks", type=int, default=DEFAULT_PEAK_BUCKETS, help="波形摘要的分组数 (0 为不生成)")
+    parser.add_argument("--transcode", choices=TRANSCODE_FORMATS, help="另存为该格式")
+    args = parser.parse_args(argv)
+
+    pool = AudioCheckPool(args.jobs)
+    invalid = 0
+    try:
+        futures = [(path, pool.check_file(path, buckets=args.peaks, transcode=args.transcode)) for path in args.files]
+        for path, future in futures:
+            result = future.result()
+            invalid += result["status"] == CHECK_INVALID
+            detail = f" ({result['error']})" if result["error"] else ""
+            print(f"{result['status']:<8}{result['duration'] or 0:>8.2f}s  {path}{detail}")
+    finally:
+        pool.shutdown()
+    return 1 if invalid else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
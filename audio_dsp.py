@@ -0,0 +1,248 @@
+import io
+import os
+import sys
+import wave
+import argparse
+
+import numpy as np
+
+LUFS_BLOCK_SECONDS = 0.4
+LUFS_BLOCK_OVERLAP = 0.75
+LUFS_ABSOLUTE_GATE = -70.0
+LUFS_RELATIVE_GATE = -10.0
+K_WEIGHTING_IR_SECONDS = 0.05
+DEFAULT_TARGET_LUFS = -16.0
+DEFAULT_PEAK_DBFS = -1.0
+DEFAULT_SILENCE_DB = -50.0
+DEFAULT_FADE_MS = 50
+
+
+def db_to_gain(db):
+    return 10.0 ** (db / 20.0)
+
+
+def decode(data):
+    """用 pygame 把 MP3/WAV 解码为 float32 PCM，返回 (samples[n, channels], sample_rate)。"""
+    import pygame
+    import pygame.sndarray
+
+    if not pygame.mixer.get_init():
+        pygame.mixer.init()
+    sample_rate, _, _ = pygame.mixer.get_init()
+    sound = pygame.mixer.Sound(file=io.BytesIO(bytes(data)))
+    samples = pygame.sndarray.array(sound)
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    if samples.dtype.kind in "iu":
+        scale = float(np.iinfo(samples.dtype).max) + 1.0
+        samples = samples.astype(np.float32) / scale
+    return samples.astype(np.float32, copy=False), sample_rate
+
+
+def to_pcm16(samples):
+    return (np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2")
+
+
+def to_wav_bytes(samples, sample_rate):
+    pcm = to_pcm16(samples)
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(pcm.shape[1])
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return out.getvalue()
+
+
+def resample(samples, src_rate, dst_rate):
+    """线性插值重采样 (没有抗混叠滤波，对语音足够)。"""
+    if src_rate == dst_rate or samples.shape[0] == 0:
+        return samples
+    n = max(1, int(round(samples.shape[0] * dst_rate / src_rate)))
+    src_t = np.arange(samples.shape[0]) / float(src_rate)
+    dst_t = np.arange(n) / float(dst_rate)
+    return np.stack([np.interp(dst_t, src_t, samples[:, c]) for c in range(samples.shape[1])], axis=1).astype(np.float32)
+
+
+def match_channels(samples, channels):
+    """转换声道数：多声道混成单声道，单声道复制到各声道。"""
+    if samples.shape[1] == channels:
+        return samples
+    mono = samples.mean(axis=1, keepdims=True, dtype=np.float32)
+    return mono if channels == 1 else np.repeat(mono, channels, axis=1)
+
+
+def apply_gain(samples, gain):
+    return samples * np.float32(gain)
+
+
+def peak_dbfs(samples):
+    peak = float(np.max(np.abs(samples))) if samples.size else 0.0
+    return 20.0 * np.log10(peak) if peak > 0 else float("-inf")
+
+
+def peak_normalize(samples, target_dbfs=DEFAULT_PEAK_DBFS):
+    current = peak_dbfs(samples)
+    if not np.isfinite(current):
+        return samples
+    return apply_gain(samples, db_to_gain(target_dbfs - current))
+
+
+def _biquad_response(b, a, w):
+    z1 = np.exp(-1j * w)
+    z2 = z1 * z1
+    return (b[0] + b[1] * z1 + b[2] * z2) / (a[0] + a[1] * z1 + a[2] * z2)
+
+
+def _k_weighting_response(sample_rate, n):
+    # BS.1770 的两级 K 计权滤波器 (高搁架 + 高通)，按采样率重新计算系数，返回 n 点 rfft 频率上的响应
+    # 系数推导见 Brecht De Man 对 BS.1770 滤波器的参数化
+    w = 2.0 * np.pi * np.fft.rfftfreq(n)
+
+    gain_db, q, fc = 3.999843853973347, 0.7071752369554196, 1681.974450955533
+    k = np.tan(np.pi * fc / sample_rate)
+    vh = 10.0 ** (gain_db / 20.0)
+    vb = vh ** 0.4996667741545416
+    shelf_b = (vh + vb * k / q + k * k, 2.0 * (k * k - vh), vh - vb * k / q + k * k)
+    shelf_a = (1.0 + k / q + k * k, 2.0 * (k * k - 1.0), 1.0 - k / q + k * k)
+
+    q, fc = 0.5003270373238773, 38.13547087602444
+    k = np.tan(np.pi * fc / sample_rate)
+    hp_b = (1.0, -2.0, 1.0)
+    hp_a = (1.0, 2.0 * (k * k - 1.0) / (1.0 + k / q + k * k), (1.0 - k / q + k * k) / (1.0 + k / q + k * k))
+
+    return _biquad_response(shelf_b, shelf_a, w) * _biquad_response(hp_b, hp_a, w)
+
+
+def _k_weighted_energy(samples, sample_rate, positions):
+    """K 计权后各声道能量之和的前缀和，只返回 positions 处的值。
+
+    滤波器的冲激响应在 K_WEIGHTING_IR_SECONDS 内已衰减到可以忽略，截断后按固定长度分块做
+    重叠相加卷积，FFT 长度为 2 的幂，耗时与内存都不随音频长度增长。
+    """
+    taps = 1 << int(np.ceil(np.log2(K_WEIGHTING_IR_SECONDS * sample_rate)))
+    impulse = np.fft.irfft(_k_weighting_response(sample_rate, 2 * taps), n=2 * taps)[:taps]
+    size = 8 * taps
+    chunk = size - taps
+    response = np.fft.rfft(impulse, size)[:, None]
+
+    n = samples.shape[0]
+    result = np.zeros(len(positions))
+    tail = np.zeros((taps, samples.shape[1]))
+    total = 0.0
+    for offset in range(0, n, chunk):
+        x = samples[offset:offset + chunk]
+        y = np.fft.irfft(np.fft.rfft(x, size, axis=0) * response, size, axis=0)
+        y[:taps] += tail
+        tail = y[len(x):len(x) + taps].copy()
+        cumulative = total + np.cumsum((y[:len(x)] ** 2).sum(axis=1))
+        inside = (positions > offset) & (positions <= offset + len(x))
+        result[inside] = cumulative[positions[inside] - offset - 1]
+        total = cumulative[-1]
+    return result
+
+
+def integrated_loudness(samples, sample_rate):
+    """按 ITU-R BS.1770 计算积分响度 (LUFS)。"""
+    n = samples.shape[0]
+    block = int(LUFS_BLOCK_SECONDS * sample_rate)
+    if n < block:
+        return float("-inf")
+
+    step = int(block * (1.0 - LUFS_BLOCK_OVERLAP))
+    starts = np.arange(0, n - block + 1, step)
+    energy = _k_weighted_energy(samples, sample_rate, np.concatenate([starts, starts + block]))
+    block_power = (energy[len(starts):] - energy[:len(starts)]) / block
+    with np.errstate(divide="ignore"):
+        block_loudness = -0.691 + 10.0 * np.log10(block_power)
+
+    gated = block_power[block_loudness > LUFS_ABSOLUTE_GATE]
+    if gated.size == 0:
+        return float("-inf")
+    relative_gate = -0.691 + 10.0 * np.log10(gated.mean()) + LUFS_RELATIVE_GATE
+    gated = block_power[(block_loudness > LUFS_ABSOLUTE_GATE) & (block_loudness > relative_gate)]
+    if gated.size == 0:
+        return float("-inf")
+    return float(-0.691 + 10.0 * np.log10(gated.mean()))
+
+
+def loudness_normalize(samples, sample_rate, target_lufs=DEFAULT_TARGET_LUFS, peak_ceiling=DEFAULT_PEAK_DBFS):
+    current = integrated_loudness(samples, sample_rate)
+    if not np.isfinite(current):
+        return samples
+    gain_db = target_lufs - current
+    headroom = peak_ceiling - peak_dbfs(samples)
+    return apply_gain(samples, db_to_gain(min(gain_db, headroom)))
+
+
+def trim_silence(samples, sample_rate, threshold_db=DEFAULT_SILENCE_DB, pad_ms=20):
+    frame = max(1, int(sample_rate * 0.01))
+    n_frames = samples.shape[0] // frame
+    if n_frames == 0:
+        return samples
+    frames = samples[:n_frames * frame].reshape(n_frames, frame, -1)
+    rms = np.sqrt(np.mean(frames ** 2, axis=(1, 2)))
+    loud = np.nonzero(rms > db_to_gain(threshold_db))[0]
+    if loud.size == 0:
+        return samples[:0]
+    pad = int(sample_rate * pad_ms / 1000)
+    start = max(0, loud[0] * frame - pad)
+    end = min(samples.shape[0], (loud[-1] + 1) * frame + pad)
+    return samples[start:end]
+
+
+def fade(samples, sample_rate, fade_in_ms=0, fade_out_ms=0):
+    samples = samples.copy()
+    n = samples.shape[0]
+    fade_in = min(n, int(sample_rate * fade_in_ms / 1000))
+    fade_out = min(n, int(sample_rate * fade_out_ms / 1000))
+    if fade_in:
+        samples[:fade_in] *= np.linspace(0.0, 1.0, fade_in, dtype=np.float32)[:, None]
+    if fade_out:
+        samples[n - fade_out:] *= np.linspace(1.0, 0.0, fade_out, dtype=np.float32)[:, None]
+    return samples
+
+
+def process(samples, sample_rate, gain=1.0, normalize=None, target=None, trim=False, fade_in_ms=0, fade_out_ms=0):
+    """normalize 取 None / "peak" / "lufs"；target 分别是 dBFS 或 LUFS。"""
+    if trim:
+        samples = trim_silence(samples, sample_rate)
+    if gain != 1.0:
+        samples = apply_gain(samples, gain)
+    if normalize == "peak":
+        samples = peak_normalize(samples, DEFAULT_PEAK_DBFS if target is None else target)
+    elif normalize == "lufs":
+        samples = loudness_normalize(samples, sample_rate, DEFAULT_TARGET_LUFS if target is None else target)
+    if fade_in_ms or fade_out_ms:
+        samples = fade(samples, sample_rate, fade_in_ms, fade_out_ms)
+    return np.clip(samples, -1.0, 1.0)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="对已生成的音频做本地后处理 (不调用 API)")
+    parser.add_argument("input", help="输入 MP3/WAV 文件")
+    parser.add_argument("output", help="输出 WAV 文件")
+    parser.add_argument("--gain-db", type=float, default=0.0, help="增益 (dB)")
+    parser.add_argument("--normalize", choices=["peak", "lufs"], help="峰值或响度归一化")
+    parser.add_argument("--target", type=float, help="归一化目标 (peak 为 dBFS，lufs 为 LUFS)")
+    parser.add_argument("--trim", action="store_true", help="去掉首尾静音")
+    parser.add_argument("--fade-in", type=int, default=0, help="淡入时长 (毫秒)")
+    parser.add_argument("--fade-out", type=int, default=0, help="淡出时长 (毫秒)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    with open(args.input, "rb") as f:
+        samples, sample_rate = decode(f.read())
+    samples = process(samples, sample_rate, gain=db_to_gain(args.gain_db), normalize=args.normalize,
+                      target=args.target, trim=args.trim, fade_in_ms=args.fade_in, fade_out_ms=args.fade_out)
+    with open(args.output, "wb") as f:
+        f.write(to_wav_bytes(samples, sample_rate))
+    print(f"已写入 {args.output} ({samples.shape[0] / sample_rate:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+import os
+import sys
+import json
+import struct
+import argparse
+
+from mp3_utils import iter_audio_frames, parse_frame_header
+
+DEFAULT_GAP_MS = 400
+DEFAULT_CHAPTER_GAP_MS = 1500
+DEFAULT_WAV_SAMPLE_RATE = 32000
+DEFAULT_WAV_CHANNELS = 1
+AUDIOBOOK_FORMATS = ("mp3", "wav")
+MAX_MP3_CHAPTERS = 255
+MAX_RIFF_SIZE = 0xFFFFFFFF
+DS64_SIZE = 28
+
+
+def read_segment(segment):
+    """segment 可以是文件路径，也可以是 AudioBuffer。"""
+    if hasattr(segment, "open_stream"):
+        with segment.open_stream() as f:
+            return f.read()
+    with open(segment, "rb") as f:
+        return f.read()
+
+
+def silent_frame(header_bytes):
+    """按给定帧头构造一个静音帧 (去掉 CRC 和 padding，side info 与主数据全为 0)。"""
+    b1, b2, b3, b4 = header_bytes[:4]
+    header = bytes((b1, b2 | 0x01, b3 & ~0x02 & 0xFF, b4))
+    return header + bytes(parse_frame_header(header, 0)["length"] - 4)
+
+
+def _id3_frame(frame_id, payload):
+    return frame_id.encode("ascii") + struct.pack(">IH", len(payload), 0) + payload
+
+
+def _id3_text(frame_id, text):
+    return _id3_frame(frame_id, b"\x01" + text.encode("utf-16") + b"\x00\x00")
+
+
+def id3_chapter_tag(chapters, title=None):
+    """生成带 CTOC/CHAP 章节帧的 ID3v2.3 标签，chapters 为 [{"title", "start", "end"}] (秒)。"""
+    if len(chapters) > MAX_MP3_CHAPTERS:
+        raise ValueError(f"MP3 chapter table supports at most {MAX_MP3_CHAPTERS} chapters")
+    frames = [_id3_text("TIT2", title)] if title else []
+    element_ids = [f"chp{i}".encode("ascii") + b"\x00" for i in range(len(chapters))]
+    frames.append(_id3_frame("CTOC", b"toc\x00" + bytes((0x03, len(element_ids))) + b"".join(element_ids)))
+    for element_id, chapter in zip(element_ids, chapters):
+        times = struct.pack(">IIII", int(round(chapter["start"] * 1000)), int(round(chapter["end"] * 1000)),
+                            0xFFFFFFFF, 0xFFFFFFFF)
+        frames.append(_id3_frame("CHAP", element_id + times + _id3_text("TIT2", chapter["title"])))
+    body = b"".join(frames)
+    size = len(body)
+    syncsafe = bytes(((size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F))
+    return b"ID3\x03\x00\x00" + syncsafe + body
+
+
+def _iter_segments(chapters):
+    """依次产出 (章节序号, 片段)。"""
+    for index, chapter in enumerate(chapters):
+        for segment in chapter["segments"]:
+            yield index, segment
+
+
+def _gap_before(index, previous_index, gap_ms, chapter_gap_ms):
+    if previous_index is None:
+        return 0
+    return chapter_gap_ms if index != previous_index else gap_ms
+
+
+def _chapter_marks(chapters, starts, total):
+    marks = []
+    for index, chapter in enumerate(chapters):
+        end = starts[index + 1] if index + 1 < len(starts) else total
+        marks.append({"title": chapter.get("title") or f"Chapter {index + 1}", "start": starts[index], "end": end})
+    return marks
+
+
+def _export_mp3(chapters, out, gap_ms, chapter_gap_ms, title, on_progress):
+    # 第一遍只统计每个片段的帧数和格式，用来计算章节时间；第二遍再逐个片段写出音频帧。
+    # 两遍都只把当前片段读进内存，所以占用与整本书的长度无关。
+    layout = []
+    frame_format = None
+    reference_header = None
+    for number, (index, segment) in enumerate(_iter_segments(chapters), start=1):
+        data = read_segment(segment)
+        samples = 0
+        for offset, header in iter_audio_frames(data):
+            fmt = (header["sample_rate"], header["channels"], header["samples"])
+            if frame_format is None:
+                frame_format = fmt
+                reference_header = bytes(data[offset:offset + 4])
+            elif fmt != frame_format:
+                raise ValueError(f"segment {number} is {fmt[0]} Hz / {fmt[1]} ch but the book is "
+                                 f"{frame_format[0]} Hz / {frame_format[1]} ch; export as WAV to convert")
+            samples += header["samples"]
+        if not samples:
+            raise ValueError(f"segment {number} is not an MP3 stream; export as WAV instead")
+        layout.append((index, segment, samples))
+    sample_rate, _, frame_samples = frame_format
+    silence = silent_frame(reference_header)
+
+    def _gap_frames(ms):
+        return int(round(ms / 1000.0 * sample_rate / frame_samples))
+
+    starts = []
+    position = 0
+    previous = None
+    for index, _, samples in layout:
+        position += _gap_frames(_gap_before(index, previous, gap_ms, chapter_gap_ms)) * frame_samples
+        if index != previous:
+            starts.append(position / sample_rate)
+        position += samples
+        previous = index
+    marks = _chapter_marks(chapters, starts, position / sample_rate)
+
+    out.write(id3_chapter_tag(marks, title))
+    previous = None
+    for done, (index, segment, _) in enumerate(layout, start=1):
+        out.write(silence * _gap_frames(_gap_before(index, previous, gap_ms, chapter_gap_ms)))
+        data = memoryview(read_segment(segment))
+        for offset, header in iter_audio_frames(data):
+            out.write(data[offset:offset + header["length"]])
+        previous = index
+        if on_progress:
+            on_progress(done, len(layout))
+    return marks
+
+
+def _riff_chunk(chunk_id, payload):
+    chunk = chunk_id + struct.pack("<I", len(payload)) + payload
+    return chunk + b"\x00" if len(payload) % 2 else chunk
+
+
+def wav_cue_chunks(marks, sample_rate):
+    """章节起点写成 cue 点，标题写进 LIST/adtl 的 labl 子块。"""
+    points = b"".join(struct.pack("<II4sIII", i + 1, i + 1, b"data", 0, 0, int(round(mark["start"] * sample_rate)))
+                      for i, mark in enumerate(marks))
+    labels = b"".join(_riff_chunk(b"labl", struct.pack("<I", i + 1) + mark["title"].encode("utf-8") + b"\x00")
+                      for i, mark in enumerate(marks))
+    return _riff_chunk(b"cue ", struct.pack("<I", len(marks)) + points) + _riff_chunk(b"LIST", b"adtl" + labels)
+
+
+def _wav_header(sample_rate, channels):
+    """16 位 PCM 的 WAV 头。JUNK 块为 RF64 的 ds64 预留位置，长度字段最后再回填。"""
+    fmt = struct.pack("<HHIIHH", 1, channels, sample_rate, sample_rate * channels * 2, channels * 2, 16)
+    return (b"RIFF" + bytes(4) + b"WAVE" + _riff_chunk(b"JUNK", bytes(DS64_SIZE))
+            + _riff_chunk(b"fmt ", fmt) + b"data" + bytes(4))
+
+
+def _finish_wav_header(out, size, data_size, frames):
+    """回填长度；超过 4 GiB 时改写为 RF64 (EBU Tech 3306)，真实长度放在 ds64 块里。"""
+    data_size_offset = 12 + 8 + DS64_SIZE + 8 + 16 + 4
+    if size - 8 <= MAX_RIFF_SIZE:
+        out.seek(4)
+        out.write(struct.pack("<I", size - 8))
+        out.seek(data_size_offset)
+        out.write(struct.pack("<I", data_size))
+    else:
+        out.seek(0)
+        out.write(b"RF64" + struct.pack("<I", MAX_RIFF_SIZE))
+        out.seek(12)
+        out.write(b"ds64" + struct.pack("<IQQQI", DS64_SIZE, size - 8, data_size, frames, 0))
+        out.seek(data_size_offset)
+        out.write(struct.pack("<I", MAX_RIFF_SIZE))
+    out.seek(size)
+
+
+def _export_wav(chapters, out, gap_ms, chapter_gap_ms, sample_rate, channels, on_progress):
+    import audio_dsp
+
+    total = sum(len(chapter["segments"]) for chapter in chapters)
+    starts = []
+    position = 0
+    previous = None
+    out.write(_wav_header(sample_rate, channels))
+    data_start = out.tell()
+    for done, (index, segment) in enumerate(_iter_segments(chapters), start=1):
+        gap = int(sample_rate * _gap_before(index, previous, gap_ms, chapter_gap_ms) / 1000)
+        out.write(bytes(gap * channels * 2))
+        position += gap
+        if index != previous:
+            starts.append(position / sample_rate)
+        samples, rate = audio_dsp.decode(read_segment(segment))
+        samples = audio_dsp.match_channels(audio_dsp.resample(samples, rate, sample_rate), channels)
+        out.write(audio_dsp.to_pcm16(samples).tobytes())
+        position += samples.shape[0]
+        previous = index
+        if on_progress:
+            on_progress(done, total)
+    if not starts:
+        raise ValueError("no segments to export")
+
+    # 章节信息追加在 data 之后，最后回填 RIFF 头和 data 块的长度
+    data_size = out.tell() - data_start
+    marks = _chapter_marks(chapters, starts, position / sample_rate)
+    out.write(wav_cue_chunks(marks, sample_rate))
+    _finish_wav_header(out, out.tell(), data_size, position)
+    return marks
+
+
+def export_audiobook(chapters, dest, audio_format=None, gap_ms=DEFAULT_GAP_MS, chapter_gap_ms=DEFAULT_CHAPTER_GAP_MS,
+                     sample_rate=DEFAULT_WAV_SAMPLE_RATE, channels=DEFAULT_WAV_CHANNELS, title=None, on_progress=None):
+    """把多个章节 (每章若干片段) 按顺序拼成一个带章节标记的文件，返回 [{"title", "start", "end"}]。
+
+    chapters 为 [{"title": 标题, "segments": [路径或 AudioBuffer]}]。
+    MP3 直接拼接音频帧 (不重新编码)，章节写入 ID3v2 CHAP/CTOC；
+    WAV 逐段解码并转换到 sample_rate/channels，章节写入 cue 点；超过 4 GiB 时写成 RF64。
+    先写入 dest.part，全部完成后再替换 dest。
+    """
+    audio_format = (audio_format or os.path.splitext(dest)[1].lstrip(".")).lower()
+    if audio_format not in AUDIOBOOK_FORMATS:
+        raise ValueError(f"unsupported audiobook format '{audio_format}', use one of {', '.join(AUDIOBOOK_FORMATS)}")
+    chapters = [chapter for chapter in chapters if chapter["segments"]]
+    if not chapters:
+        raise ValueError("no segments to export")
+
+    os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+    temp_path = dest + ".part"
+    try:
+        with open(temp_path, "w+b") as out:
+            if audio_format == "mp3":
+                marks = _export_mp3(chapters, out, gap_ms, chapter_gap_ms, title, on_progress)
+            else:
+                marks = _export_wav(chapters, out, gap_ms, chapter_gap_ms, int(sample_rate), int(channels), on_progress)
+        os.replace(temp_path, dest)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    return marks
+
+
+def load_chapters(path):
+    """读取章节 JSON：[{"title": ..., "segments": [...]}]，相对路径以 JSON 文件所在目录为准。"""
+    with open(path, "r", encoding="utf-8") as f:
+        chapters = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    return [{"title": chapter.get("title"),
+             "segments": [os.path.join(base, segment) for segment in chapter["segments"]]}
+            for chapter in chapters]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="把多个已生成的音频拼成一个带章节标记的有声书文件")
+    parser.add_argument("output", help="输出文件 (.mp3 或 .wav)")
+    parser.add_argument("inputs", nargs="*", help="按顺序排列的音频文件，每个文件一章")
+    parser.add_argument("--chapters", help="章节 JSON 文件，每章可包含多个片段，指定后忽略 inputs")
+    parser.add_argument("--titles", nargs="+", help="与 inputs 一一对应的章节标题")
+    parser.add_argument("--title", help="整本书的标题 (仅 MP3)")
+    parser.add_argument("--gap-ms", type=int, default=DEFAULT_GAP_MS, help="同一章内片段之间的静音 (毫秒)")
+    parser.add_argument("--chapter-gap-ms", type=int, default=DEFAULT_CHAPTER_GAP_MS, help="章节之间的静音 (毫秒)")
+    parser.add_argument("--sample-rate", type=int, default=DEFAULT_WAV_SAMPLE_RATE, help="WAV 输出的采样率")
+    parser.add_argument("--channels", type=int, choices=[1, 2], default=DEFAULT_WAV_CHANNELS, help="WAV 输出的声道数")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.chapters:
+        chapters = load_chapters(args.chapters)
+    else:
+        titles = args.titles or []
+        chapters = [{"title": titles[i] if i < len(titles) else os.path.splitext(os.path.basename(path))[0],
+                     "segments": [path]} for i, path in enumerate(args.inputs)]
+    if not chapters:
+        print("错误：未提供输入文件 (inputs 或 --chapters)")
+        return 2
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+    def _report(done, total):
+        print(f"\r[{done}/{total}]", end="", flush=True)
+
+    try:
+        marks = export_audiobook(chapters, args.output, gap_ms=args.gap_ms, chapter_gap_ms=args.chapter_gap_ms,
+                                 sample_rate=args.sample_rate, channels=args.channels, title=args.title,
+                                 on_progress=_report)
+    except (OSError, ValueError) as e:
+        print(f"\n错误：{e}")
+        return 1
+    print()
+    for mark in marks:
+        print(f"  {mark['start']:>9.2f}s  {mark['title']}")
+    print(f"已写入 {args.output} ({len(marks)} 章，{marks[-1]['end']:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+
+JOURNAL_FILE = "batch_journal.sqlite3"
+DEFAULT_FLUSH_ROWS = 50
+DEFAULT_FLUSH_SECONDS = 1.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    item_id     TEXT PRIMARY KEY,
+    params_hash TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    output      TEXT,
+    bytes       INTEGER,
+    seconds     REAL,
+    error       TEXT,
+    attempts    INTEGER NOT NULL DEFAULT 1,
+    updated     REAL NOT NULL
+)
+"""
+
+
+class BatchJournal:
+    """用 SQLite 记录批量合成每一项的结果，中断后重新运行可以跳过已完成的项。
+
+    record() 先放进内存，攒够 flush_rows 条或距上次写入超过 flush_seconds 时在一个事务里批量写入，
+    因此崩溃时最多丢失最后一批记录 (这些项会被重新合成，不会被错误地跳过)。
+    """
+
+    def __init__(self, path, flush_rows=DEFAULT_FLUSH_ROWS, flush_seconds=DEFAULT_FLUSH_SECONDS):
+        self.path = path
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(_SCHEMA)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._completed = None
+
+    def completed(self):
+        """{item_id: (params_hash, output, bytes)}，只包含状态为 done 的项。"""
+        if self._completed is None:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT item_id, params_hash, output, bytes FROM items WHERE status = 'done'").fetchall()
+            self._completed = {row[0]: row[1:] for row in rows}
+        return self._completed
+
+    def is_done(self, item_id, params_hash):
+        """参数没变且输出文件仍然完整时才算已完成。"""
+        entry = self.completed().get(item_id)
+        if entry is None or entry[0] != params_hash:
+            return False
+        output, size = entry[1], entry[2]
+        try:
+            return os.path.getsize(output) == size
+        except (OSError, TypeError):
+            return False
+
+    def record(self, item_id, params_hash, status, output=None, size=None, seconds=None, error=None):
+        with self._lock:
+            self._pending.append((item_id, params_hash, status, output, size, seconds, error, time.time()))
+            due = len(self._pending) >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_seconds
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            rows, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+            if not rows:
+                return
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO items (item_id, params_hash, status, output, bytes, seconds, error, updated) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(item_id) DO UPDATE SET params_hash = excluded.params_hash, "
+                    "status = excluded.status, output = excluded.output, bytes = excluded.bytes, "
+                    "seconds = excluded.seconds, error = excluded.error, "
+                    "attempts = items.attempts + 1, updated = excluded.updated",
+                    rows)
+
+    def summary(self):
+        self.flush()
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM items GROUP BY status").fetchall())
+
+    def failed_items(self):
+        self.flush()
+        with self._lock:
+            return self._conn.execute(
+                "SELECT item_id, error FROM items WHERE status = 'failed' ORDER BY updated").fetchall()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="查看批量合成的任务日志")
+    parser.add_argument("journal", help=f"日志文件，通常是输出目录下的 {JOURNAL_FILE}")
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.journal):
+        print(f"错误：找不到日志文件 '{args.journal}'")
+        return 2
+    journal = BatchJournal(args.journal)
+    try:
+        for status, count in sorted(journal.summary().items()):
+            print(f"{status:<10}{count:>8}")
+        for item_id, error in journal.failed_items():
+            print(f"  失败 {item_id}: {error}")
+    finally:
+        journal.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
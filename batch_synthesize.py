@@ -0,0 +1,307 @@
+import os
+import re
+import sys
+import csv
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from speech_engine import MODEL_NAME, PARAMETER_CONFIG, SpeechEngine, api_param_name, build_params
+from synthesis_cache import DEFAULT_CACHE_BYTES, SynthesisCache, params_hash
+from batch_journal import JOURNAL_FILE, BatchJournal
+from audio_check import CHECK_INVALID, CHECK_SUSPECT, DEFAULT_PEAK_BUCKETS, TRANSCODE_FORMATS, AudioCheckPool
+from long_text import synthesize_long_text
+import http_transport
+from request_scheduler import DEFAULT_MAX_CONCURRENCY, DEFAULT_RATE, RequestScheduler
+from metrics import METRICS
+
+PARAM_KEYS = {c["id"] for c in PARAMETER_CONFIG if c["type"] != "separator"}
+PARAM_KEYS |= {api_param_name(k) for k in PARAM_KEYS}
+_UNSAFE_FILENAME = re.compile(r"[^\w.-]+")
+
+
+def safe_item_id(raw_id, index):
+    """id 同时用作文件名和任务日志的键：去掉路径分隔符等字符，不允许以 . 开头。"""
+    item_id = _UNSAFE_FILENAME.sub("_", str(raw_id or "")).lstrip(".")
+    return item_id or f"{index + 1:05d}"
+
+
+def item_output_path(output_dir, item_id):
+    path = os.path.join(output_dir, f"{item_id}.mp3")
+    root = os.path.abspath(output_dir)
+    if os.path.dirname(os.path.abspath(path)) != root:
+        raise ValueError(f"id {item_id!r} is not a plain file name")
+    return path
+
+
+def load_items(path):
+    items = []
+    if path.lower().endswith(".csv"):
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        rows = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                row = json.loads(line)
+                rows.append(row if isinstance(row, dict) else {"text": row})
+
+    seen = {}
+    for index, row in enumerate(rows):
+        text = row.get("text", "")
+        if not text or not text.strip():
+            print(f"警告: 第 {index + 1} 条没有文本，已跳过")
+            continue
+        item_id = safe_item_id(row.get("id"), index)
+        # 相同 id 会并发写同一个文件，也会互相覆盖任务日志里的记录
+        if item_id in seen:
+            raise ValueError(f"第 {index + 1} 条的 id {item_id!r} 与第 {seen[item_id]} 条重复")
+        seen[item_id] = index + 1
+        overrides = {k: v for k, v in row.items() if k in PARAM_KEYS and v not in (None, "")}
+        items.append({
+            "id": item_id,
+            "text": text,
+            "overrides": overrides,
+        })
+    return items
+
+
+def load_lang_data(lang_code, language_folder="langs"):
+    if not lang_code:
+        return {}
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(base_path, language_folder, f"{lang_code}.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def run_batch(engine, items, base_values, output_dir, workers=4, lang_data=None, on_result=None,
+              long_text=False, chunk_workers=None, journal=None, resume=False,
+              checker=None, peaks=DEFAULT_PEAK_BUCKETS, transcode=None):
+    """在有界线程池中并发合成 items，返回每条的结果字典列表 (顺序与完成顺序一致)。
+
+    传入 journal 时记录每条的结果；resume 为 True 时跳过日志中已完成且输出文件完整的条目。
+    传入 checker (AudioCheckPool) 时，下载完成的文件交给进程池解码校验，下载线程不等待校验结果；
+    无法解码或被截断的文件算作失败，并从缓存中删除。
+    """
+    workers = max(1, int(workers))
+    os.makedirs(output_dir, exist_ok=True)
+    results = []
+
+    def _run_one(item):
+        started = time.perf_counter()
+        dest_path = os.path.join(output_dir, f"{item['id']}.mp3")
+        result = {"id": item["id"], "output": dest_path}
+        key = params = check = None
+        try:
+            item_output_path(output_dir, item["id"])
+            params = build_params(item["text"], {**base_values, **item["overrides"]}, lang_data)
+            key = params_hash(params, MODEL_NAME)
+            if resume and journal is not None and journal.is_done(item["id"], key):
+                result["status"] = "skipped"
+                result["seconds"] = 0.0
+                return result, None, None, None
+            with METRICS.labels(item=item["id"]), METRICS.timer("item_total"):
+                if long_text:
+                    synthesize_long_text(engine, params, dest_path, workers=chunk_workers)
+                else:
+                    engine.synthesize(params, dest_path)
+            result["status"] = "done"
+            result["bytes"] = os.path.getsize(dest_path)
+            if checker is not None:
+                check = checker.check_file(dest_path, params["text"], params.get("speed", 1.0), peaks, transcode)
+        except Exception as e:
+            result["status"] = "failed"
+            result["error"] = str(e)
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        return result, key, params, check
+
+    def _apply_check(result, params, future):
+        try:
+            check = future.result()
+        except Exception as e:
+            check = {"status": CHECK_INVALID, "error": str(e)}
+        result["check"] = check["status"]
+        for field in ("duration", "peaks_path", "transcoded"):
+            if check.get(field) is not None:
+                result[field] = check[field]
+        if check["status"] == CHECK_INVALID:
+            result["status"] = "failed"
+            result["error"] = check["error"]
+            if engine.cache is not None:
+                engine.cache.discard(params)
+        elif check["status"] == CHECK_SUSPECT:
+            result["warning"] = check["error"]
+
+    def _finish(result, key):
+        if journal is not None and key is not None:
+            journal.record(result["id"], key, result["status"], result["output"], result.get("bytes"),
+                           result["seconds"], result.get("error"))
+        results.append(result)
+        if on_result:
+            on_result(result)
+
+    pending = set()
+    checking = {}
+    item_iter = iter(items)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            while len(pending) < workers * 2:
+                item = next(item_iter, None)
+                if item is None:
+                    break
+                pending.add(executor.submit(_run_one, item))
+            if not pending and not checking:
+                break
+            done, _ = wait(pending | set(checking), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in checking:
+                    result, key, params = checking.pop(future)
+                    _apply_check(result, params, future)
+                    _finish(result, key)
+                    continue
+                pending.discard(future)
+                result, key, params, check = future.result()
+                if check is not None:
+                    checking[check] = (result, key, params)
+                else:
+                    _finish(result, key)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Minimax Speech-02-HD 批量合成")
+    parser.add_argument("input", help="CSV (含 text 列) 或 JSONL 文件")
+    parser.add_argument("-o", "--output-dir", default="batch_output", help="输出目录")
+    parser.add_argument("-p", "--params", help="参数 JSON 文件，键与 PARAMETER_CONFIG 的 id 相同")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="KEY=VALUE",
+                        help="单个参数，可重复，例如 --set voice_id=Wise_Woman")
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help="工作线程数，实际的 API 并发由调度器根据限流情况自动调整")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="每秒最多发起的 API 请求数 (0 为不限)")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY, help="API 并发上限")
+    parser.add_argument("--lang", help="用于解析显示名的语言文件，例如 zh_CN")
+    parser.add_argument("--long-text", action="store_true", help="超过 5000 字的文本自动分段并行合成后拼接")
+    parser.add_argument("--chunk-workers", type=int, help="长文本模式下每条文本的分段并发数，默认等于 --max-concurrency")
+    parser.add_argument("--pool-size", type=int, default=http_transport.DEFAULT_POOL_SIZE,
+                        help="HTTP 连接池大小 (复用 keep-alive 连接)")
+    parser.add_argument("--chunk-kb", type=int, default=http_transport.DEFAULT_CHUNK_SIZE // 1024,
+                        help="下载分块大小 (KB)")
+    parser.add_argument("--retries", type=int, default=http_transport.DEFAULT_RETRIES,
+                        help="网络错误的最大重试次数 (指数退避，下载支持断点续传)")
+    parser.add_argument("--cache-dir", default="synthesis_cache", help="合成结果缓存目录")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_CACHE_BYTES / (1024 * 1024),
+                        help="缓存容量上限 (MB)，超出后按 LRU 淘汰")
+    parser.add_argument("--no-cache", action="store_true", help="不使用缓存")
+    parser.add_argument("--resume", action="store_true", help="跳过任务日志中已完成的条目 (中断后继续)")
+    parser.add_argument("--journal", help=f"任务日志 (SQLite) 路径，默认为输出目录下的 {JOURNAL_FILE}")
+    parser.add_argument("--no-journal", action="store_true", help="不记录任务日志")
+    parser.add_argument("--no-check", action="store_true", help="下载后不解码校验")
+    parser.add_argument("--check-workers", type=int, help="校验用的进程数，默认等于 CPU 核数")
+    parser.add_argument("--peaks", type=int, default=DEFAULT_PEAK_BUCKETS,
+                        help="每个文件旁写出的波形摘要分组数 (0 为不生成)")
+    parser.add_argument("--transcode", choices=TRANSCODE_FORMATS, help="校验时另存为该格式")
+    parser.add_argument("--metrics-jsonl", help="逐条写入各阶段耗时的 JSON lines 文件")
+    parser.add_argument("--metrics-prom", help="结束时写入 Prometheus 文本格式的指标文件")
+    parser.add_argument("--metrics-port", type=int, help="运行期间在本机该端口提供 /metrics")
+    parser.add_argument("--api-key", help="Replicate API 密钥，默认读取 REPLICATE_API_TOKEN")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    base_values = {}
+    if args.params:
+        with open(args.params, "r", encoding="utf-8") as f:
+            base_values.update(json.load(f))
+    for pair in args.overrides:
+        key, _, value = pair.partition("=")
+        base_values[key.strip()] = value.strip()
+
+    api_key = args.api_key or os.environ.get("REPLICATE_API_TOKEN")
+    if not api_key:
+        print("错误：未提供 API 密钥 (--api-key 或 REPLICATE_API_TOKEN)")
+        return 2
+
+    try:
+        items = load_items(args.input)
+    except ValueError as e:
+        print(f"错误：{e}")
+        return 2
+    METRICS.set_jsonl_path(args.metrics_jsonl)
+    metrics_server = METRICS.serve(args.metrics_port) if args.metrics_port else None
+    cache = None
+    if not args.no_cache:
+        cache = SynthesisCache(args.cache_dir, int(args.cache_max_mb * 1024 * 1024), MODEL_NAME)
+    http_transport.configure(pool_size=max(args.pool_size, args.workers), retries=args.retries)
+    scheduler = RequestScheduler(rate=args.rate, max_concurrency=args.max_concurrency)
+    engine = SpeechEngine(api_token=api_key, chunk_size=args.chunk_kb * 1024, cache=cache, retries=args.retries,
+                          scheduler=scheduler)
+    journal = None
+    if not args.no_journal:
+        journal = BatchJournal(args.journal or os.path.join(args.output_dir, JOURNAL_FILE))
+    total = len(items)
+    counter = {"done": 0}
+
+    def _report(result):
+        counter["done"] += 1
+        if result["status"] == "skipped":
+            return
+        status = result["status"] if result["status"] == "done" else f"失败: {result.get('error')}"
+        if result.get("warning"):
+            status += f" (可疑: {result['warning']})"
+        stats = scheduler.stats()
+        print(f"[{counter['done']}/{total}] {result['id']} {status} ({result['seconds']}s)"
+              f" 并发 {stats['concurrency']} 排队 {stats['queue_depth']}")
+
+    checker = None if args.no_check else AudioCheckPool(args.check_workers)
+    started = time.perf_counter()
+    try:
+        results = run_batch(engine, items, base_values, args.output_dir, args.workers,
+                            load_lang_data(args.lang), on_result=_report,
+                            long_text=args.long_text, chunk_workers=args.chunk_workers,
+                            journal=journal, resume=args.resume,
+                            checker=checker, peaks=args.peaks, transcode=args.transcode)
+    finally:
+        if checker is not None:
+            checker.shutdown()
+        if journal is not None:
+            journal.close()
+    elapsed = time.perf_counter() - started
+    failed = sum(1 for r in results if r["status"] == "failed")
+    skipped = sum(1 for r in results if r["status"] == "skipped")
+    print(f"完成 {total - failed}/{total} (其中 {skipped} 条在之前的运行中已完成)，失败 {failed}，耗时 {elapsed:.1f}s")
+    if checker is not None:
+        invalid = sum(1 for r in results if r.get("check") == CHECK_INVALID)
+        suspect = sum(1 for r in results if r.get("check") == CHECK_SUSPECT)
+        print(f"校验: 损坏 {invalid}，时长或内容可疑 {suspect}")
+    stats = scheduler.stats()
+    print(f"API 调用 {stats['completed']} 次，限流 {stats['throttled']} 次，重试 {stats['retries']} 次，"
+          f"最终并发 {stats['concurrency']}")
+    if cache is not None:
+        stats = cache.stats()
+        print(f"缓存命中 {stats['hits']}，未命中 {stats['misses']}，占用 {stats['bytes'] / (1024 * 1024):.1f} MB")
+    print_metrics_summary(METRICS.summary())
+    for key, value in scheduler.stats().items():
+        METRICS.set_gauge(f"scheduler_{key}", value)
+    if args.metrics_prom:
+        METRICS.write_prometheus(args.metrics_prom)
+    if metrics_server is not None:
+        metrics_server.shutdown()
+    METRICS.close()
+    return 1 if failed else 0
+
+
+def print_metrics_summary(summary):
+    if not summary:
+        return
+    print(f"{'阶段':<16}{'次数':>8}{'p50 (s)':>10}{'p95 (s)':>10}{'max (s)':>10}")
+    for stage, row in sorted(summary.items()):
+        print(f"{stage:<16}{row['count']:>8}{row['p50']:>10.3f}{row['p95']:>10.3f}{row['max']:>10.3f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
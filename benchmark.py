@@ -0,0 +1,177 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+
+import http_transport
+from batch_synthesize import run_batch
+from fake_replicate import FakeReplicateServer, add_config_arguments, config_from_args
+from metrics import METRICS
+from request_scheduler import DEFAULT_RATE, RequestScheduler
+from speech_engine import MODEL_NAME, SpeechEngine
+from synthesis_cache import SynthesisCache
+
+DEFAULT_RESULTS_FILE = "bench_results.jsonl"
+REPORT_STAGES = ("queue_wait", "api_call", "first_byte", "download", "item_total")
+SAMPLE_SENTENCES = [
+    "今天的天气非常好，适合出去散步。",
+    "The quick brown fox jumps over the lazy dog. ",
+    "人工智能正在改变我们的生活方式。",
+    "Please remember to bring your umbrella tomorrow. ",
+]
+
+
+def git_revision():
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=base_path, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=base_path,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{revision}-dirty" if dirty else revision
+
+
+def make_items(count, chars, duplicate_ratio=0.0, seed=0):
+    """生成 count 条约 chars 字的文本；duplicate_ratio 比例的条目重复前面的文本，用于测缓存。"""
+    rng = random.Random(seed)
+    items = []
+    for index in range(count):
+        if items and rng.random() < duplicate_ratio:
+            text = rng.choice(items)["text"]
+        else:
+            text = f"{index:05d} "
+            while len(text) < chars:
+                text += rng.choice(SAMPLE_SENTENCES)
+            text = text[:chars]
+        items.append({"id": f"{index + 1:05d}", "text": text, "overrides": {}})
+    return items
+
+
+def run_scenario(server, concurrency, chars, args):
+    METRICS.reset()
+    http_transport.configure(pool_size=max(http_transport.DEFAULT_POOL_SIZE, concurrency), retries=args.retries)
+    scheduler = RequestScheduler(rate=args.rate, max_concurrency=concurrency)
+    items = make_items(args.requests, chars, args.duplicate_ratio, args.seed)
+    server_before = server.stats()
+
+    with tempfile.TemporaryDirectory(prefix="speech-bench-") as work_dir:
+        cache = SynthesisCache(os.path.join(work_dir, "cache"), model_name=MODEL_NAME) if args.cache else None
+        engine = SpeechEngine(api_token="fake", cache=cache, retries=args.retries, scheduler=scheduler)
+        started = time.perf_counter()
+        results = run_batch(engine, items, {}, os.path.join(work_dir, "out"), workers=concurrency,
+                            long_text=args.long_text)
+        elapsed = time.perf_counter() - started
+
+    server_after = server.stats()
+    done = [r for r in results if r["status"] == "done"]
+    total_bytes = sum(r.get("bytes", 0) for r in done)
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "scenario": {
+            "concurrency": concurrency,
+            "chars": chars,
+            "requests": args.requests,
+            "cache": args.cache,
+            "duplicate_ratio": args.duplicate_ratio,
+            "long_text": args.long_text,
+            "rate": args.rate,
+            "server": vars(server.config),
+        },
+        "elapsed": round(elapsed, 3),
+        "requests_per_second": round(len(done) / elapsed, 3) if elapsed else 0.0,
+        "mb_per_second": round(total_bytes / (1024 * 1024) / elapsed, 3) if elapsed else 0.0,
+        "failed": len(results) - len(done),
+        "stages": METRICS.summary(),
+        "server": {key: server_after[key] - server_before[key] for key in server_after},
+        "scheduler": scheduler.stats(),
+        "cache": cache.stats() if cache is not None else None,
+    }
+
+
+def scenario_key(result):
+    scenario = dict(result["scenario"])
+    scenario.pop("server", None)
+    return json.dumps(scenario, sort_keys=True)
+
+
+def load_results(path):
+    results = []
+    if not path or not os.path.exists(path):
+        return results
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                results.append(json.loads(line))
+    return results
+
+
+def stage_p95(result, stage):
+    return result["stages"].get(stage, {}).get("p95")
+
+
+def print_result(result, baseline=None):
+    scenario = result["scenario"]
+    line = (f"并发 {scenario['concurrency']:>3}  字数 {scenario['chars']:>5}  "
+            f"{result['requests_per_second']:>7.2f} req/s  {result['mb_per_second']:>7.2f} MB/s  "
+            f"失败 {result['failed']}  限流 {result['server']['throttled']}")
+    for stage in REPORT_STAGES:
+        p95 = stage_p95(result, stage)
+        if p95 is not None:
+            line += f"  {stage} p95 {p95:.3f}s"
+    print(line)
+    if baseline is not None:
+        before = baseline["requests_per_second"]
+        change = (result["requests_per_second"] - before) / before * 100 if before else 0.0
+        print(f"    对比 {baseline['revision']}: {before:.2f} -> {result['requests_per_second']:.2f} req/s ({change:+.1f}%)")
+
+
+def parse_list(value):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="使用本地模拟服务对合成流程做离线基准测试 (不消耗 API 额度)")
+    parser.add_argument("--concurrency", type=parse_list, default=[1, 4, 16], help="逗号分隔的并发数列表")
+    parser.add_argument("--sizes", type=parse_list, default=[200, 1000, 4000], help="逗号分隔的文本长度 (字) 列表")
+    parser.add_argument("-n", "--requests", type=int, default=32, help="每个场景的请求数")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="调度器每秒请求数上限 (0 为不限)")
+    parser.add_argument("--retries", type=int, default=http_transport.DEFAULT_RETRIES, help="网络错误重试次数")
+    parser.add_argument("--cache", action="store_true", help="启用合成缓存 (每个场景使用新的空缓存)")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.0, help="重复文本所占比例，配合 --cache 使用")
+    parser.add_argument("--long-text", action="store_true", help="走长文本分段合成路径")
+    parser.add_argument("--seed", type=int, default=0, help="生成测试文本的随机种子")
+    parser.add_argument("-o", "--output", default=DEFAULT_RESULTS_FILE, help="追加写入结果的 JSON lines 文件")
+    parser.add_argument("--compare", help="与该结果文件中同一场景的最近一次结果对比，默认为 --output")
+    add_config_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    baselines = {}
+    for previous in load_results(args.compare or args.output):
+        baselines[scenario_key(previous)] = previous
+
+    with FakeReplicateServer(config_from_args(args)) as server:
+        os.environ["REPLICATE_BASE_URL"] = server.base_url
+        print(f"模拟服务: {server.base_url}，版本 {git_revision()}")
+        for chars in args.sizes:
+            for concurrency in args.concurrency:
+                result = run_scenario(server, concurrency, chars, args)
+                print_result(result, baselines.get(scenario_key(result)))
+                if args.output:
+                    with open(args.output, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(result, ensure_ascii=False) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
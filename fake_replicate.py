@@ -0,0 +1,281 @@
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import itertools
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from speech_engine import MODEL_NAME
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, 无填充位：每帧 417 字节，约 26 ms
+MP3_FRAME_HEADER = b"\xff\xfb\x90\x64"
+MP3_FRAME_BYTES = 417
+DEFAULT_BYTES_PER_CHAR = 1200
+
+
+def fake_mp3(num_bytes):
+    """生成能被 mp3_utils 逐帧解析的静音 MP3 数据 (长度向上取整到整帧)。"""
+    frames = max(1, -(-num_bytes // MP3_FRAME_BYTES))
+    frame = MP3_FRAME_HEADER + bytes(MP3_FRAME_BYTES - len(MP3_FRAME_HEADER))
+    return frame * frames
+
+
+class FakeReplicateConfig:
+    """模拟服务的行为参数，运行中修改也会立即生效。
+
+    latency 为预测的基础耗时，latency_per_char 随文本长度增加；
+    throughput 为下载速度上限 (字节/秒，0 为不限)；
+    max_inflight 超出时返回 429，burst_every/burst_length 周期性地整段返回 429。
+    """
+
+    def __init__(self, latency=0.5, latency_per_char=0.0005, jitter=0.2, throughput=2 * 1024 * 1024,
+                 error_rate=0.0, max_inflight=0, burst_every=0.0, burst_length=0.0,
+                 drop_rate=0.0, bytes_per_char=DEFAULT_BYTES_PER_CHAR):
+        self.latency = latency
+        self.latency_per_char = latency_per_char
+        self.jitter = jitter
+        self.throughput = throughput
+        self.error_rate = error_rate
+        self.max_inflight = max_inflight
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.drop_rate = drop_rate
+        self.bytes_per_char = bytes_per_char
+
+
+class FakeReplicateServer:
+    """本地的 Replicate 预测接口和音频 CDN 替身。
+
+    把 REPLICATE_BASE_URL 指向 base_url 后，replicate.run(MODEL_NAME) 和输出 URL 的下载都会落到这里。
+    """
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or FakeReplicateConfig()
+        self.predictions = 0
+        self.throttled = 0
+        self.failed = 0
+        self.downloads = 0
+        self.dropped = 0
+        self._inflight = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._files = {}
+        self._started = time.monotonic()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-replicate", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _in_burst(self):
+        config = self.config
+        if config.burst_every <= 0 or config.burst_length <= 0:
+            return False
+        return (time.monotonic() - self._started) % config.burst_every < config.burst_length
+
+    def _predict(self, body):
+        """返回 (status, payload)。"""
+        config = self.config
+        with self._lock:
+            self.predictions += 1
+            over_limit = config.max_inflight and self._inflight >= config.max_inflight
+            if over_limit or self._in_burst():
+                self.throttled += 1
+                return 429, {"detail": "Request was throttled.", "status": 429}
+            self._inflight += 1
+        try:
+            text = str((body.get("input") or {}).get("text", ""))
+            delay = config.latency + config.latency_per_char * len(text)
+            time.sleep(max(0.0, delay * (1 + random.uniform(-config.jitter, config.jitter))))
+            if random.random() < config.error_rate:
+                with self._lock:
+                    self.failed += 1
+                return 503, {"detail": "Service temporarily unavailable.", "status": 503}
+            prediction_id = f"fake{next(self._ids):08d}"
+            with self._lock:
+                self._files[prediction_id] = max(1, len(text)) * config.bytes_per_char
+            now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+            return 201, {
+                "id": prediction_id,
+                "model": MODEL_NAME,
+                "version": "fake",
+                "status": "succeeded",
+                "input": body.get("input"),
+                "output": f"{self.base_url}/files/{prediction_id}.mp3",
+                "logs": "",
+                "error": None,
+                "metrics": {"predict_time": round(delay, 3)},
+                "created_at": now,
+                "started_at": now,
+                "completed_at": now,
+                "urls": {},
+            }
+        finally:
+            with self._lock:
+                self._inflight -= 1
+
+    def _make_handler(self):
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if status == 429:
+                    self.send_header("Retry-After", "1")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if self.path.rstrip("/") != f"/v1/models/{MODEL_NAME}/predictions":
+                    self._send_json(404, {"detail": "Not found.", "status": 404})
+                    return
+                status, payload = server._predict(body)
+                self._send_json(status, payload)
+
+            def do_GET(self):
+                name = self.path.split("?")[0].rsplit("/", 1)[-1]
+                with server._lock:
+                    size = server._files.get(name[:-len(".mp3")]) if name.endswith(".mp3") else None
+                if size is None:
+                    self._send_json(404, {"detail": "Not found.", "status": 404})
+                    return
+                server._send_file(self, fake_mp3(size))
+
+        return _Handler
+
+    def _send_file(self, handler, data):
+        config = self.config
+        start = 0
+        range_header = handler.headers.get("Range", "")
+        if range_header.startswith("bytes="):
+            start = int(range_header[len("bytes="):].split("-")[0] or 0)
+            if start >= len(data):
+                handler.send_response(416)
+                handler.send_header("Content-Length", "0")
+                handler.end_headers()
+                return
+            handler.send_response(206)
+            handler.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        else:
+            handler.send_response(200)
+        handler.send_header("Content-Type", "audio/mpeg")
+        handler.send_header("Content-Length", str(len(data) - start))
+        handler.end_headers()
+        with self._lock:
+            self.downloads += 1
+
+        # 按 throughput 限速发送；drop_rate 的概率在中途断开连接，用于测试断点续传
+        drop_at = len(data)
+        if random.random() < config.drop_rate:
+            drop_at = random.randint(start, len(data) - 1)
+        block = 16 * 1024
+        sent_started = time.monotonic()
+        position = start
+        while position < len(data):
+            if position >= drop_at:
+                with self._lock:
+                    self.dropped += 1
+                handler.close_connection = True
+                handler.connection.shutdown(2)
+                return
+            end = min(len(data), position + block, drop_at)
+            handler.wfile.write(data[position:end])
+            position = end
+            if config.throughput:
+                ahead = (position - start) / config.throughput - (time.monotonic() - sent_started)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "predictions": self.predictions,
+                "throttled": self.throttled,
+                "failed": self.failed,
+                "downloads": self.downloads,
+                "dropped": self.dropped,
+            }
+
+
+def add_config_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.5, help="每次预测的基础耗时 (秒)")
+    parser.add_argument("--latency-per-char", type=float, default=0.0005, help="每个字符增加的耗时 (秒)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="耗时的随机浮动比例")
+    parser.add_argument("--throughput-kb", type=float, default=2048, help="下载限速 (KB/s，0 为不限)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="预测返回 503 的概率")
+    parser.add_argument("--max-inflight", type=int, default=0, help="同时处理的预测数上限，超出返回 429 (0 为不限)")
+    parser.add_argument("--burst-every", type=float, default=0.0, help="每隔多少秒出现一次 429 突发")
+    parser.add_argument("--burst-length", type=float, default=0.0, help="每次 429 突发持续的秒数")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="下载中途断开连接的概率")
+    parser.add_argument("--bytes-per-char", type=int, default=DEFAULT_BYTES_PER_CHAR, help="每个字符对应的音频字节数")
+
+
+def config_from_args(args):
+    return FakeReplicateConfig(
+        latency=args.latency,
+        latency_per_char=args.latency_per_char,
+        jitter=args.jitter,
+        throughput=int(args.throughput_kb * 1024),
+        error_rate=args.error_rate,
+        max_inflight=args.max_inflight,
+        burst_every=args.burst_every,
+        burst_length=args.burst_length,
+        drop_rate=args.drop_rate,
+        bytes_per_char=args.bytes_per_char,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地模拟 Replicate 接口和音频下载，用于离线测试和基准测试")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+    server = FakeReplicateServer(config_from_args(args), args.host, args.port)
+    print(f"模拟服务已启动: {server.base_url}")
+    print(f"使用方法: REPLICATE_BASE_URL={server.base_url} REPLICATE_API_TOKEN=fake python batch_synthesize.py ...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import time
+import random
+import threading
+
+# requests / httpx / replicate 导入较慢，放到首次使用时再导入以加快启动
+from audio_buffer import open_output
+from metrics import METRICS
+
+DEFAULT_POOL_SIZE = 16
+DEFAULT_CHUNK_SIZE = 64 * 1024
+DEFAULT_RETRIES = 4
+DEFAULT_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+RETRY_STATUS = (429, 500, 502, 503, 504)
+DOWNLOAD_TIMEOUT = (10, 60)
+
+_lock = threading.Lock()
+_session = None
+_pool_size = DEFAULT_POOL_SIZE
+_replicate_clients = {}
+
+
+def backoff_delay(attempt, backoff=DEFAULT_BACKOFF, max_delay=MAX_BACKOFF):
+    delay = min(max_delay, backoff * (2 ** attempt))
+    return delay * (0.5 + random.random() / 2)
+
+
+def build_session(pool_size=DEFAULT_POOL_SIZE, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    global _session
+    with _lock:
+        if _session is None:
+            _session = build_session()
+        return _session
+
+
+def configure(pool_size=DEFAULT_POOL_SIZE, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+    """替换共享连接池的配置，之后新建的 Replicate 客户端也使用同样的池大小。"""
+    global _session, _pool_size
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = build_session(pool_size, retries, backoff)
+        _pool_size = pool_size
+        _replicate_clients.clear()
+
+
+def get_replicate_client(api_token):
+    import httpx
+    import replicate
+
+    with _lock:
+        client = _replicate_clients.get(api_token)
+        if client is None:
+            transport = httpx.HTTPTransport(
+                retries=DEFAULT_RETRIES,
+                limits=httpx.Limits(max_connections=_pool_size, max_keepalive_connections=_pool_size),
+            )
+            client = replicate.Client(api_token=api_token, transport=transport)
+            _replicate_clients[api_token] = client
+        return client
+
+
+def download_with_resume(url, dest, chunk_size=DEFAULT_CHUNK_SIZE, retries=DEFAULT_RETRIES,
+                         backoff=DEFAULT_BACKOFF, on_chunk=None, on_progress=None, session=None, check_cancelled=None):
+    """流式下载到 dest (路径或可写对象)，连接中断后用 Range 请求从已写入的位置继续。
+
+    check_cancelled 在每个数据块之前调用，抛出异常即中止下载。
+    """
+    import requests
+
+    session = session or get_session()
+    written = 0
+    fed = 0
+    attempt = 0
+    started = time.perf_counter()
+    first_byte = None
+    write_seconds = 0.0
+    with open_output(dest) as f:
+        while True:
+            headers = {"Range": f"bytes={written}-"} if written else {}
+            try:
+                with session.get(url, stream=True, headers=headers, timeout=DOWNLOAD_TIMEOUT) as response:
+                    if written and response.status_code == 416:
+                        break
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        written = 0
+                        f.seek(0)
+                        f.truncate()
+                    length = response.headers.get("Content-Length")
+                    total = written + int(length) if length and length.isdigit() else None
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        if check_cancelled is not None:
+                            check_cancelled()
+                        if first_byte is None:
+                            first_byte = time.perf_counter() - started
+                            METRICS.observe("first_byte", first_byte)
+                        write_started = time.perf_counter()
+                        f.write(chunk)
+                        write_seconds += time.perf_counter() - write_started
+                        written += len(chunk)
+                        if on_chunk and written > fed:
+                            on_chunk(chunk[len(chunk) - (written - fed):])
+                            fed = written
+                        if on_progress:
+                            on_progress(written, total)
+                break
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+                if attempt >= retries:
+                    raise
+                time.sleep(backoff_delay(attempt, backoff))
+                attempt += 1
+
+    # download 为首字节之后的传输耗时，bytes_per_second 即下载吞吐
+    elapsed = time.perf_counter() - started
+    transfer = elapsed - (first_byte or 0.0)
+    METRICS.observe("download", transfer, bytes=written, retries=attempt,
+                    bytes_per_second=round(written / transfer) if transfer > 0 else None)
+    METRICS.observe("file_write", write_seconds, bytes=written)
+    METRICS.count("download_bytes", written)
+    return dest
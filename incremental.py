@@ -0,0 +1,133 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from audio_buffer import AudioBuffer, open_output
+from long_text import chunk_text, split_sentences
+from mp3_utils import concat_mp3
+from speech_engine import MODEL_NAME
+from synthesis_cache import params_hash
+
+DEFAULT_MAX_SEGMENTS = 2000
+
+
+def segment_text(text, max_chars=None):
+    """切成逐句的片段；只有标点的片段并入前一句，超长的句子再按 chunk_text 切开。"""
+    segments = []
+    for sentence in split_sentences(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if segments and not any(ch.isalnum() for ch in sentence):
+            segments[-1] += sentence
+            continue
+        segments.extend(chunk_text(sentence, max_chars) if max_chars else chunk_text(sentence))
+    return segments
+
+
+class IncrementalSynthesizer:
+    """逐句合成并按 (句子文本, 参数) 保存每句的音频，修改文本后只重新合成变化或新增的句子。
+
+    句子的音频以 params_hash 为键保存在内存中 (LRU，最多 max_segments 句)，
+    再配合 engine 自带的磁盘缓存，重启程序后未改动的句子也不会再次调用 API。
+    同一句正在合成时 (例如首句试听)，其他调用方等待它的结果而不是重复请求。
+    """
+
+    def __init__(self, max_segments=DEFAULT_MAX_SEGMENTS):
+        self.max_segments = max_segments
+        self._segments = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            buffer = self._segments.get(key)
+            if buffer is not None:
+                self._segments.move_to_end(key)
+            return buffer
+
+    def _put(self, key, buffer):
+        with self._lock:
+            self._segments[key] = buffer
+            self._segments.move_to_end(key)
+            while len(self._segments) > self.max_segments:
+                self._segments.popitem(last=False)
+
+    def segment_key(self, params, segment):
+        return params_hash(dict(params, text=segment), MODEL_NAME)
+
+    def synthesize_segment(self, engine, params, segment, priority=False):
+        """合成单句并放入缓存；已有或正在合成时直接复用。"""
+        key = self.segment_key(params, segment)
+        while True:
+            buffer = self._get(key)
+            if buffer is not None:
+                return buffer
+            with self._lock:
+                future = self._in_flight.get(key)
+                owner = future is None
+                if owner:
+                    future = self._in_flight[key] = Future()
+            if owner:
+                break
+            try:
+                return future.result()
+            except Exception:
+                # 别人的那次合成失败了，由自己重新发起
+                continue
+
+        try:
+            buffer = engine.synthesize(dict(params, text=segment), AudioBuffer(), priority=priority).finish()
+        except BaseException as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+        self._put(key, buffer)
+        with self._lock:
+            self._in_flight.pop(key, None)
+        future.set_result(buffer)
+        return buffer
+
+    def plan(self, params):
+        """返回 [(句子, 键, 已有的音频或 None)]，为 None 的句子需要重新合成。"""
+        plan = []
+        for segment in segment_text(params["text"]):
+            key = self.segment_key(params, segment)
+            plan.append((segment, key, self._get(key)))
+        return plan
+
+    def synthesize(self, engine, params, dest, workers=4, on_segment_done=None):
+        """合成并按顺序拼接到 dest，返回 {"segments", "synthesized", "reused"}。"""
+        plan = self.plan(params)
+        if not plan:
+            raise ValueError("text is empty")
+        missing = {}
+        for segment, key, buffer in plan:
+            if buffer is None:
+                missing[key] = segment
+
+        lock = threading.Lock()
+        progress = {"done": 0}
+
+        def _synthesize_segment(item):
+            key, segment = item
+            buffer = self.synthesize_segment(engine, params, segment)
+            if on_segment_done:
+                with lock:
+                    progress["done"] += 1
+                    on_segment_done(progress["done"], len(missing))
+            return key, buffer
+
+        fresh = {}
+        if missing:
+            executor = ThreadPoolExecutor(max_workers=max(1, min(workers, len(missing))))
+            try:
+                fresh = dict(executor.map(_synthesize_segment, missing.items()))
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+        buffers = [buffer if buffer is not None else fresh[key] for _, key, buffer in plan]
+        with open_output(dest) as out:
+            concat_mp3((buffer.getvalue() for buffer in buffers), out)
+        return {"segments": len(plan), "synthesized": len(missing), "reused": len(plan) - len(missing)}
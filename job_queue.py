@@ -0,0 +1,130 @@
+import time
+import queue
+import itertools
+import threading
+from collections import OrderedDict
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINISHED_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, job_id, params, output_path, options=None):
+        self.id = job_id
+        self.params = params
+        self.output_path = output_path
+        self.options = options or {}
+        self.status = JOB_QUEUED
+        self.progress = 0.0
+        self.error = None
+        self.result = None
+        self.created = time.time()
+        self.cancel_event = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+
+class JobQueue:
+    """后台任务队列：runner(job, report_progress) 在线程池中执行，返回值存入 job.result，
+    状态变化通过 on_update 通知。
+
+    on_update 在工作线程中调用，界面层需要自行切回主线程。
+    工作线程是守护线程：关闭窗口时不必等待进行中的 API 调用返回。
+    """
+
+    def __init__(self, runner, max_workers, on_update=None):
+        self.runner = runner
+        self.on_update = on_update
+        self.jobs = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pending = queue.Queue()
+        self._workers = [threading.Thread(target=self._work, name=f"speech-job-{i}", daemon=True)
+                         for i in range(max_workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def next_id(self):
+        return next(self._ids)
+
+    def _notify(self, job):
+        if self.on_update:
+            self.on_update(job)
+
+    def submit(self, job):
+        with self._lock:
+            self.jobs[job.id] = job
+        self._notify(job)
+        self._pending.put(job)
+        return job
+
+    def _work(self):
+        while True:
+            job = self._pending.get()
+            if job is None:
+                return
+            self._run(job)
+
+    def _report_progress(self, job, progress):
+        progress = max(0.0, min(1.0, progress))
+        if progress - job.progress >= 0.01 or progress >= 1.0:
+            job.progress = progress
+            self._notify(job)
+
+    def _run(self, job):
+        if job.cancel_event.is_set():
+            return
+        job.status = JOB_RUNNING
+        self._notify(job)
+        try:
+            job.result = self.runner(job, lambda progress: self._report_progress(job, progress))
+            job.check_cancelled()
+            job.status = JOB_DONE
+            job.progress = 1.0
+        except JobCancelled:
+            job.status = JOB_CANCELLED
+        except Exception as e:
+            if job.cancel_event.is_set():
+                job.status = JOB_CANCELLED
+            else:
+                job.status = JOB_FAILED
+                job.error = str(e)
+        self._notify(job)
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return
+        job.cancel_event.set()
+        if job.status == JOB_QUEUED:
+            job.status = JOB_CANCELLED
+            self._notify(job)
+
+    def remove_finished(self, keep=()):
+        """从列表中移除已结束的任务 (keep 中的 id 除外)，返回被移除的任务。"""
+        with self._lock:
+            removed = [job for job in self.jobs.values() if job.finished and job.id not in keep]
+            for job in removed:
+                del self.jobs[job.id]
+        return removed
+
+    def shutdown(self):
+        # 先给所有任务 (包括正在运行的) 设置取消标记，下载循环会在下一个数据块处退出
+        for job_id in list(self.jobs):
+            self.cancel(job_id)
+        for _ in self._workers:
+            self._pending.put(None)
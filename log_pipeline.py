@@ -0,0 +1,56 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+DEFAULT_FLUSH_MS = 100
+DEFAULT_MAX_LINES = 2000
+DEFAULT_MAX_PENDING = 5000
+DEFAULT_MAX_BATCH = 500
+DEFAULT_LOG_FILE_BYTES = 1024 * 1024
+DEFAULT_LOG_FILE_BACKUPS = 3
+
+
+class LogQueue:
+    """线程安全的日志队列：任意线程调用 put()，界面线程按固定间隔 drain() 批量取出。
+
+    待显示的消息最多保留 max_pending 条，超出时丢弃最旧的并计数，
+    这样无论工作线程写多少日志，界面线程每次刷新的开销都有上限。
+    指定 file_path 时同时写入按大小滚动的日志文件 (写文件发生在调用 put 的线程)。
+    """
+
+    def __init__(self, max_pending=DEFAULT_MAX_PENDING, file_path=None,
+                 max_file_bytes=DEFAULT_LOG_FILE_BYTES, backup_count=DEFAULT_LOG_FILE_BACKUPS):
+        self._pending = deque(maxlen=max_pending)
+        self._lock = threading.Lock()
+        self.dropped = 0
+        self._file_handler = None
+        if file_path:
+            os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+            self._file_handler = RotatingFileHandler(file_path, maxBytes=max_file_bytes,
+                                                     backupCount=backup_count, encoding="utf-8")
+            self._file_handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+
+    def put(self, message):
+        line = f"[{time.strftime('%H:%M:%S', time.localtime())}] {message}"
+        with self._lock:
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append(line)
+        if self._file_handler is not None:
+            self._file_handler.handle(logging.makeLogRecord({"msg": message, "levelno": logging.INFO}))
+
+    def drain(self, limit=DEFAULT_MAX_BATCH):
+        """取出最多 limit 条，返回 (lines, dropped)，dropped 为上次取出以来被丢弃的条数。"""
+        with self._lock:
+            count = min(limit, len(self._pending))
+            lines = [self._pending.popleft() for _ in range(count)]
+            dropped, self.dropped = self.dropped, 0
+        return lines, dropped
+
+    def close(self):
+        if self._file_handler is not None:
+            self._file_handler.close()
+            self._file_handler = None
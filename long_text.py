@@ -0,0 +1,93 @@
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from audio_buffer import AudioBuffer, open_output
+from mp3_utils import concat_mp3
+from speech_engine import MAX_TEXT_LENGTH
+
+DEFAULT_CHUNK_CHARS = 1500
+DEFAULT_CHUNK_WORKERS = 4
+
+_SENTENCE_BOUNDARY = re.compile(r'(?:[。！？!?；;…]+|\.(?=\s|$))[”’」』"\'）)\]]*[ \t]*|\n\s*')
+_SOFT_BREAK = re.compile(r'[，,、：:\s]')
+
+
+def split_sentences(text):
+    """按句末标点和换行切分，返回的片段首尾相接即为原文。"""
+    sentences = []
+    start = 0
+    for m in _SENTENCE_BOUNDARY.finditer(text):
+        if m.end() > start:
+            sentences.append(text[start:m.end()])
+            start = m.end()
+    if start < len(text):
+        sentences.append(text[start:])
+    return sentences
+
+
+def _split_long_sentence(sentence, max_chars):
+    pieces = []
+    while len(sentence) > max_chars:
+        cut = 0
+        for m in _SOFT_BREAK.finditer(sentence, 0, max_chars):
+            cut = m.end()
+        if cut == 0:
+            cut = max_chars
+        pieces.append(sentence[:cut])
+        sentence = sentence[cut:]
+    if sentence:
+        pieces.append(sentence)
+    return pieces
+
+
+def chunk_text(text, max_chars=DEFAULT_CHUNK_CHARS):
+    max_chars = min(max_chars, MAX_TEXT_LENGTH)
+    chunks = []
+    current = ""
+    for sentence in split_sentences(text):
+        for piece in _split_long_sentence(sentence, max_chars):
+            if current and len(current) + len(piece) > max_chars:
+                chunks.append(current)
+                current = ""
+            current += piece
+    if current:
+        chunks.append(current)
+    return [c.strip() for c in chunks if c.strip()]
+
+
+def synthesize_long_text(engine, params, dest, workers=None, max_chars=DEFAULT_CHUNK_CHARS, on_chunk_done=None):
+    """分块并发合成长文本，并按原顺序拼接为一个 MP3。
+
+    workers 默认为调度器的并发上限，实际同时进行的调用数由调度器按限流情况调整；
+    没有调度器时为 DEFAULT_CHUNK_WORKERS。
+    """
+    if workers is None:
+        workers = engine.scheduler.max_concurrency if engine.scheduler is not None else DEFAULT_CHUNK_WORKERS
+    chunks = chunk_text(params["text"], max_chars)
+    if not chunks:
+        raise ValueError("text is empty")
+    if len(chunks) == 1:
+        return engine.synthesize(dict(params, text=chunks[0]), dest)
+
+    lock = threading.Lock()
+    progress = {"done": 0}
+
+    def _synthesize_chunk(chunk):
+        buffer = engine.synthesize(dict(params, text=chunk), AudioBuffer()).finish()
+        if on_chunk_done:
+            with lock:
+                progress["done"] += 1
+                on_chunk_done(progress["done"], len(chunks))
+        return buffer
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks))))
+    try:
+        buffers = list(executor.map(_synthesize_chunk, chunks))
+    finally:
+        # 出错或被取消时不再启动排队中的分段
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    with open_output(dest) as out:
+        concat_mp3((buffer.getvalue() for buffer in buffers), out)
+    return dest
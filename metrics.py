@@ -0,0 +1,182 @@
+import os
+import json
+import math
+import time
+import threading
+import contextlib
+from collections import deque
+
+DEFAULT_MAX_SAMPLES = 2048
+QUANTILES = (0.5, 0.95)
+METRIC_PREFIX = "speech"
+
+
+def percentile(sorted_values, q):
+    """最近秩法取分位数，sorted_values 需已排序。"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Metrics:
+    """按阶段记录耗时 (秒)，可选逐条写入 JSON lines，并导出带 p50/p95 的 Prometheus 文本。
+
+    每个阶段只保留最近 max_samples 个样本用于分位数，_sum/_count 为累计值。
+    """
+
+    def __init__(self, jsonl_path=None, max_samples=DEFAULT_MAX_SAMPLES):
+        self.max_samples = max_samples
+        self._samples = {}
+        self._totals = {}
+        self._counters = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._sink = None
+        self.set_jsonl_path(jsonl_path)
+
+    def set_jsonl_path(self, jsonl_path):
+        with self._lock:
+            if self._sink is not None:
+                self._sink.close()
+                self._sink = None
+            if jsonl_path:
+                os.makedirs(os.path.dirname(os.path.abspath(jsonl_path)), exist_ok=True)
+                self._sink = open(jsonl_path, "a", encoding="utf-8")
+
+    @contextlib.contextmanager
+    def labels(self, **fields):
+        """在当前线程内给之后的每条记录附加字段，例如 job=3。
+
+        yield 出的字典累计本线程在此期间各阶段的耗时，便于按任务汇总。
+        """
+        previous = getattr(self._local, "fields", {})
+        previous_stages = getattr(self._local, "stages", None)
+        stages = {}
+        self._local.fields = {**previous, **fields}
+        self._local.stages = stages
+        try:
+            yield stages
+        finally:
+            self._local.fields = previous
+            self._local.stages = previous_stages
+
+    def observe(self, stage, seconds, **fields):
+        record = {"ts": round(time.time(), 3), "stage": stage, "seconds": round(seconds, 6)}
+        record.update(getattr(self._local, "fields", {}))
+        record.update(fields)
+        stages = getattr(self._local, "stages", None)
+        if stages is not None:
+            stages[stage] = stages.get(stage, 0.0) + seconds
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.max_samples)
+                self._totals[stage] = [0, 0.0]
+            samples.append(seconds)
+            self._totals[stage][0] += 1
+            self._totals[stage][1] += seconds
+            if self._sink is not None:
+                self._sink.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self._sink.flush()
+
+    @contextlib.contextmanager
+    def timer(self, stage, **fields):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, **fields)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self._gauges[name] = value
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    def summary(self):
+        with self._lock:
+            snapshot = {stage: (sorted(samples), self._totals[stage]) for stage, samples in self._samples.items()}
+        result = {}
+        for stage, (values, (count, total)) in snapshot.items():
+            result[stage] = {
+                "count": count,
+                "sum": round(total, 6),
+                "p50": round(percentile(values, 0.5), 6),
+                "p95": round(percentile(values, 0.95), 6),
+                "max": round(values[-1], 6) if values else 0.0,
+            }
+        return result
+
+    def prometheus_text(self):
+        name = f"{METRIC_PREFIX}_stage_seconds"
+        lines = [f"# HELP {name} Time spent in each synthesis stage.", f"# TYPE {name} summary"]
+        with self._lock:
+            snapshot = {stage: (sorted(samples), self._totals[stage]) for stage, samples in self._samples.items()}
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+        for stage in sorted(snapshot):
+            values, (count, total) = snapshot[stage]
+            for q in QUANTILES:
+                lines.append(f'{name}{{stage="{stage}",quantile="{q}"}} {percentile(values, q):.6f}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+        for counter in sorted(counters):
+            lines.append(f"# TYPE {METRIC_PREFIX}_{counter}_total counter")
+            lines.append(f"{METRIC_PREFIX}_{counter}_total {counters[counter]}")
+        for gauge in sorted(gauges):
+            lines.append(f"# TYPE {METRIC_PREFIX}_{gauge} gauge")
+            lines.append(f"{METRIC_PREFIX}_{gauge} {gauges[gauge]}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """原子写入，适合 node_exporter 的 textfile collector 读取。"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # 多个线程可能同时导出，每个线程用自己的临时文件
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+        return path
+
+    def serve(self, port, host="127.0.0.1"):
+        """在后台线程中提供 GET /metrics，返回 server，调用 server.shutdown() 停止。"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), _Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+    def close(self):
+        self.set_jsonl_path(None)
+
+
+# 进程内共享的默认实例，各模块直接往这里记录
+METRICS = Metrics()
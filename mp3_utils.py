@@ -0,0 +1,103 @@
+_BITRATES_V1_L3 = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320]
+_BITRATES_V2_L3 = [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    0: [11025, 12000, 8000],
+}
+_VBR_TAGS = (b"Xing", b"Info", b"VBRI")
+
+
+def skip_id3v2(data, offset=0):
+    while len(data) - offset >= 10 and bytes(data[offset:offset + 3]) == b"ID3":
+        size = 0
+        for b in data[offset + 6:offset + 10]:
+            size = (size << 7) | (b & 0x7F)
+        footer = 10 if data[offset + 5] & 0x10 else 0
+        offset += 10 + size + footer
+    return offset
+
+
+def parse_frame_header(data, offset):
+    """解析 MPEG Layer III 帧头，无效时返回 None。"""
+    if len(data) - offset < 4:
+        return None
+    b1, b2, b3, b4 = data[offset], data[offset + 1], data[offset + 2], data[offset + 3]
+    if b1 != 0xFF or (b2 & 0xE0) != 0xE0:
+        return None
+    version = (b2 >> 3) & 0x03
+    layer = (b2 >> 1) & 0x03
+    bitrate_index = (b3 >> 4) & 0x0F
+    sample_rate_index = (b3 >> 2) & 0x03
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    padding = (b3 >> 1) & 0x01
+    sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+    if version == 3:
+        bitrate = _BITRATES_V1_L3[bitrate_index] * 1000
+        samples = 1152
+    else:
+        bitrate = _BITRATES_V2_L3[bitrate_index] * 1000
+        samples = 576
+    return {
+        "length": samples // 8 * bitrate // sample_rate + padding,
+        "bitrate": bitrate,
+        "sample_rate": sample_rate,
+        "samples": samples,
+        "channels": 1 if (b4 >> 6) == 3 else 2,
+    }
+
+
+def iter_frames(data, offset=0):
+    """依次产出 (offset, header)，跳过 ID3 标签和无法同步的字节。"""
+    end = len(data)
+    if end >= 128 and bytes(data[end - 128:end - 125]) == b"TAG":
+        end -= 128
+    offset = skip_id3v2(data, offset)
+    while offset + 4 <= end:
+        header = parse_frame_header(data, offset)
+        if header is None:
+            offset += 1
+            continue
+        next_offset = offset + header["length"]
+        if next_offset > end:
+            break
+        if next_offset + 4 <= end and parse_frame_header(data, next_offset) is None:
+            offset += 1
+            continue
+        yield offset, header
+        offset = next_offset
+
+
+def is_vbr_header_frame(data, offset, header):
+    frame = bytes(data[offset:offset + min(header["length"], 64)])
+    return any(tag in frame for tag in _VBR_TAGS)
+
+
+def iter_audio_frames(data):
+    """同 iter_frames，但跳过开头的 Xing/Info/VBRI 信息帧。"""
+    first = True
+    for offset, header in iter_frames(data):
+        if first:
+            first = False
+            if is_vbr_header_frame(data, offset, header):
+                continue
+        yield offset, header
+
+
+def audio_frames(data):
+    """返回去掉 ID3/Xing 信息帧后的纯音频帧 (bytes)。"""
+    view = memoryview(data)
+    return b"".join(view[offset:offset + header["length"]] for offset, header in iter_audio_frames(view))
+
+
+def concat_mp3(parts, out_file):
+    """按顺序拼接多个 MP3 数据块，写入 out_file (文件对象)，返回写入的字节数。"""
+    written = 0
+    for data in parts:
+        frames = audio_frames(data)
+        out_file.write(frames)
+        written += len(frames)
+    return written
+
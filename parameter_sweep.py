@@ -0,0 +1,146 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import itertools
+
+import http_transport
+from batch_synthesize import load_lang_data, run_batch
+from request_scheduler import DEFAULT_MAX_CONCURRENCY, DEFAULT_RATE, RequestScheduler
+from speech_engine import MODEL_NAME, SpeechEngine, build_params
+from synthesis_cache import SynthesisCache, params_hash
+
+SWEEP_PARAMS = ("voice_id", "emotion", "speed", "pitch")
+SWEEP_INDEX_FILE = "sweep.json"
+
+_VALUE_SEPARATOR = re.compile(r"[,，、]")
+_UNSAFE_FILENAME = re.compile(r"[^\w.-]+")
+
+
+def parse_values(value_text):
+    """"a, b，c" -> ["a", "b", "c"]，同时接受中文逗号和顿号。"""
+    return [v.strip() for v in _VALUE_SEPARATOR.split(value_text or "") if v.strip()]
+
+
+def expand_sweep(text, base_values, sweep_values, lang_data=None):
+    """展开各参数取值的笛卡尔积，最终 params 相同的组合只保留第一个。
+
+    sweep_values 以 PARAMETER_CONFIG 的 id 为键，值为原始取值列表 (可以是显示名)。
+    返回 [{"values": 本组合的取值, "params": 最终 params}]。
+    """
+    keys = [key for key, values in sweep_values.items() if values]
+    combos = []
+    seen = set()
+    for combo in itertools.product(*(sweep_values[key] for key in keys)):
+        values = dict(zip(keys, combo))
+        params = build_params(text, {**base_values, **values}, lang_data)
+        key = params_hash(params)
+        if key in seen:
+            continue
+        seen.add(key)
+        combos.append({"values": values, "params": params})
+    return combos
+
+
+def combo_label(values):
+    return " · ".join(str(value) for value in values.values())
+
+
+def combo_id(index, values):
+    name = "_".join(f"{key}-{value}" for key, value in values.items())
+    return f"{index + 1:03d}_{_UNSAFE_FILENAME.sub('', name)[:80]}"
+
+
+def run_sweep(engine, text, base_values, combos, output_dir, workers=4, lang_data=None, on_result=None):
+    """并发合成所有组合，写出 sweep.json 索引，返回按组合顺序排列的结果。"""
+    items = [{"id": combo_id(i, combo["values"]), "text": text, "overrides": combo["values"]}
+             for i, combo in enumerate(combos)]
+    results = {r["id"]: r for r in run_batch(engine, items, base_values, output_dir, workers, lang_data, on_result)}
+    ordered = []
+    for item, combo in zip(items, combos):
+        ordered.append(dict(results[item["id"]], values=combo["values"], params=combo["params"]))
+    with open(os.path.join(output_dir, SWEEP_INDEX_FILE), "w", encoding="utf-8") as f:
+        json.dump(ordered, f, ensure_ascii=False, indent=2)
+    return ordered
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="同一段文本按多组参数批量试听 (参数矩阵)")
+    parser.add_argument("text", nargs="?", help="要合成的文本")
+    parser.add_argument("--text-file", help="从文件读取文本")
+    parser.add_argument("--sweep", action="append", default=[], metavar="KEY=V1,V2",
+                        help="要遍历的参数及取值，可重复，例如 --sweep speed=0.8,1.0,1.2")
+    parser.add_argument("-o", "--output-dir", default="sweep_output", help="输出目录")
+    parser.add_argument("-p", "--params", help="其余参数的 JSON 文件")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="KEY=VALUE",
+                        help="固定的单个参数，可重复")
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_MAX_CONCURRENCY, help="工作线程数")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="每秒最多发起的 API 请求数 (0 为不限)")
+    parser.add_argument("--lang", help="用于解析显示名的语言文件，例如 zh_CN")
+    parser.add_argument("--cache-dir", default="synthesis_cache", help="合成结果缓存目录")
+    parser.add_argument("--no-cache", action="store_true", help="不使用缓存")
+    parser.add_argument("--dry-run", action="store_true", help="只列出去重后的组合，不调用 API")
+    parser.add_argument("--api-key", help="Replicate API 密钥，默认读取 REPLICATE_API_TOKEN")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    text = args.text
+    if args.text_file:
+        with open(args.text_file, "r", encoding="utf-8") as f:
+            text = f.read()
+    if not text or not text.strip():
+        print("错误：未提供文本")
+        return 2
+
+    base_values = {}
+    if args.params:
+        with open(args.params, "r", encoding="utf-8") as f:
+            base_values.update(json.load(f))
+    for pair in args.overrides:
+        key, _, value = pair.partition("=")
+        base_values[key.strip()] = value.strip()
+    sweep_values = {}
+    for pair in args.sweep:
+        key, _, value = pair.partition("=")
+        sweep_values[key.strip()] = parse_values(value)
+
+    lang_data = load_lang_data(args.lang)
+    combos = expand_sweep(text, base_values, sweep_values, lang_data)
+    total = 1
+    for values in sweep_values.values():
+        total *= max(1, len(values))
+    print(f"共 {total} 个组合，去重后 {len(combos)} 个")
+    if args.dry_run:
+        for i, combo in enumerate(combos):
+            print(f"  {combo_id(i, combo['values'])}: {json.dumps(combo['params'], ensure_ascii=False)}")
+        return 0
+
+    api_key = args.api_key or os.environ.get("REPLICATE_API_TOKEN")
+    if not api_key:
+        print("错误：未提供 API 密钥 (--api-key 或 REPLICATE_API_TOKEN)")
+        return 2
+
+    http_transport.configure(pool_size=max(http_transport.DEFAULT_POOL_SIZE, args.workers))
+    cache = None if args.no_cache else SynthesisCache(args.cache_dir, model_name=MODEL_NAME)
+    engine = SpeechEngine(api_token=api_key, cache=cache, scheduler=RequestScheduler(rate=args.rate))
+    counter = {"done": 0}
+
+    def _report(result):
+        counter["done"] += 1
+        status = result["status"] if result["status"] == "done" else f"失败: {result.get('error')}"
+        print(f"[{counter['done']}/{len(combos)}] {result['id']} {status} ({result['seconds']}s)")
+
+    started = time.perf_counter()
+    results = run_sweep(engine, text, base_values, combos, args.output_dir, args.workers, lang_data, _report)
+    failed = sum(1 for r in results if r["status"] != "done")
+    print(f"完成 {len(results) - failed}/{len(results)}，耗时 {time.perf_counter() - started:.1f}s，"
+          f"索引: {os.path.join(args.output_dir, SWEEP_INDEX_FILE)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+import time
+import threading
+
+from http_transport import DEFAULT_BACKOFF, backoff_delay
+from metrics import METRICS
+
+DEFAULT_RATE = 5.0
+DEFAULT_MIN_CONCURRENCY = 1
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_INITIAL_CONCURRENCY = 4
+DEFAULT_MAX_ATTEMPTS = 6
+THROTTLE_STATUS = (429, 500, 502, 503, 504)
+CANCEL_POLL_SECONDS = 0.1
+
+
+def error_status(error):
+    import httpx
+
+    status = getattr(error, "status", None)
+    if status is None and isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+    return status
+
+
+def is_throttle_error(error):
+    return error_status(error) in THROTTLE_STATUS
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate or 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_time = (1 - self._tokens) / self.rate
+            time.sleep(wait_time)
+
+
+class RequestScheduler:
+    """令牌桶限速 + AIMD 并发控制：成功时并发上限缓慢增加，遇到 429/5xx 时减半并退避重试。
+
+    priority=True 的请求 (例如试听用的首句) 在队列里排在普通请求前面。
+    check_cancelled 在排队期间定期调用，抛出异常 (例如 JobCancelled) 即放弃排队，不会再发起请求。
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=None, min_concurrency=DEFAULT_MIN_CONCURRENCY,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY, initial_concurrency=DEFAULT_INITIAL_CONCURRENCY,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS, backoff=DEFAULT_BACKOFF, decrease_factor=0.5):
+        self.bucket = TokenBucket(rate, burst)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max(min_concurrency, max_concurrency)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.decrease_factor = decrease_factor
+        self._limit = float(min(max(initial_concurrency, min_concurrency), self.max_concurrency))
+        self._in_flight = 0
+        self._waiting = 0
+        self._priority_waiting = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        self.completed = 0
+        self.failed = 0
+        self.throttled = 0
+        self.retries = 0
+
+    def _acquire(self, priority=False, check_cancelled=None):
+        started = time.perf_counter()
+        if check_cancelled is not None:
+            check_cancelled()
+        with self._cond:
+            self._waiting += 1
+            if priority:
+                self._priority_waiting += 1
+            try:
+                while self._in_flight >= int(self._limit) or (self._priority_waiting and not priority):
+                    if check_cancelled is not None:
+                        check_cancelled()
+                    self._cond.wait(CANCEL_POLL_SECONDS if check_cancelled is not None else None)
+            finally:
+                self._waiting -= 1
+                if priority:
+                    self._priority_waiting -= 1
+                    if not self._priority_waiting:
+                        self._cond.notify_all()
+            self._in_flight += 1
+        self.bucket.acquire()
+        if check_cancelled is not None:
+            try:
+                check_cancelled()
+            except BaseException:
+                # 拿到名额后才发现已取消：把名额还回去，不计入成功或失败
+                with self._cond:
+                    self._in_flight -= 1
+                    self._cond.notify_all()
+                raise
+        METRICS.observe("queue_wait", time.perf_counter() - started)
+
+    def _release(self, outcome, started):
+        with self._cond:
+            self._in_flight -= 1
+            if outcome == "success":
+                self.completed += 1
+                self._limit = min(self.max_concurrency, self._limit + 1.0 / self._limit)
+            elif outcome == "throttled":
+                self.throttled += 1
+                # 同一轮拥塞里已经在途的请求陆续失败时只减一次
+                if started > self._last_decrease:
+                    self._limit = max(self.min_concurrency, self._limit * self.decrease_factor)
+                    self._last_decrease = time.monotonic()
+            else:
+                self.failed += 1
+            self._cond.notify_all()
+
+    def call(self, fn, *args, priority=False, check_cancelled=None, **kwargs):
+        attempt = 0
+        while True:
+            self._acquire(priority, check_cancelled)
+            started = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                import httpx
+                throttled = is_throttle_error(e)
+                self._release("throttled" if throttled else "error", started)
+                if not (throttled or isinstance(e, httpx.TransportError)) or attempt + 1 >= self.max_attempts:
+                    raise
+                with self._cond:
+                    self.retries += 1
+                time.sleep(backoff_delay(attempt, self.backoff))
+                attempt += 1
+                continue
+            self._release("success", started)
+            return result
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queue_depth": self._waiting,
+                "in_flight": self._in_flight,
+                "concurrency": int(self._limit),
+                "completed": self.completed,
+                "throttled": self.throttled,
+                "failed": self.failed,
+                "retries": self.retries,
+            }
@@ -0,0 +1,156 @@
+import os
+import time
+
+from http_transport import (DEFAULT_BACKOFF, DEFAULT_CHUNK_SIZE, DEFAULT_RETRIES, backoff_delay,
+                            download_with_resume, get_replicate_client)
+from metrics import METRICS
+
+MODEL_NAME = "minimax/speech-02-hd"
+MAX_TEXT_LENGTH = 5000
+TRANSIENT_API_STATUS = (500, 502, 503, 504)
+
+PARAMETER_CONFIG = [
+    {"id": "voice_id",      "type": "combobox", "json_map": "voice_map"},
+    {"id": "speed",         "type": "slider",   "range": (0.5, 2.0), "steps": 30,  "default": 1.0},
+    {"id": "volume",        "type": "slider",   "range": (0.0, 10.0),"steps": 100, "default": 1.0},
+    {"id": "pitch",         "type": "slider",   "range": (-12, 12),  "steps": 24,  "default": 0},
+    {"id": "emotion",       "type": "combobox", "json_map": "emotion_map"},
+    {"id": "eng_norm",      "type": "checkbox", "default": False},
+    {"id": "advanced_sep",  "type": "separator"},
+    {"id": "bitrate",       "type": "combobox", "options": ["32000", "64000", "128000", "256000"], "default": "128000"},
+    {"id": "sample_rate",   "type": "combobox", "options": ["8000", "16000", "22050", "24000", "32000", "44100"], "default": "32000"},
+    {"id": "channel",       "type": "combobox", "json_map": "channel_map"},
+    {"id": "lang_boost",    "type": "combobox", "json_map": "language_boost_map"},
+]
+
+API_PARAM_NAMES = {
+    "eng_norm": "english_normalization",
+    "lang_boost": "language_boost",
+}
+
+
+def api_param_name(param_id):
+    return API_PARAM_NAMES.get(param_id, param_id)
+
+
+def _to_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def build_params(text, raw_values, lang_data=None, parameter_config=PARAMETER_CONFIG):
+    """把界面/配置里的原始取值转换成 replicate 所需的 input 字典。
+
+    raw_values 以 PARAMETER_CONFIG 的 id 为键 (也接受映射后的 API 名)，
+    下拉框的值既可以是语言文件里的显示名，也可以直接是 API 取值。
+    """
+    lang_data = lang_data or {}
+    params = {"text": text}
+    for config in parameter_config:
+        param_id = config["id"]
+        if config["type"] == "separator":
+            continue
+
+        api_param_id = api_param_name(param_id)
+        if param_id in raw_values:
+            raw_value = raw_values[param_id]
+        elif api_param_id in raw_values:
+            raw_value = raw_values[api_param_id]
+        elif "default" in config:
+            raw_value = config["default"]
+        else:
+            continue
+
+        if config["type"] == "checkbox":
+            params[api_param_id] = _to_bool(raw_value)
+        elif config["type"] == "slider":
+            params[api_param_id] = int(float(raw_value)) if param_id == "pitch" else float(raw_value)
+        elif config["type"] == "combobox":
+            if "json_map" in config:
+                options_map = lang_data.get(config["json_map"], {})
+                params[api_param_id] = options_map.get(raw_value, raw_value)
+            else:
+                raw_value = str(raw_value)
+                params[api_param_id] = int(raw_value) if raw_value.isdigit() else raw_value
+    return params
+
+
+def is_transient_api_error(error):
+    import httpx
+    from replicate.exceptions import ReplicateError
+
+    if isinstance(error, httpx.TransportError):
+        return True
+    return isinstance(error, ReplicateError) and error.status in TRANSIENT_API_STATUS
+
+
+def validate_text(text):
+    if not text or not text.strip():
+        raise ValueError("text is empty")
+    if len(text) > MAX_TEXT_LENGTH:
+        raise ValueError(f"text is too long ({len(text)}/{MAX_TEXT_LENGTH})")
+
+
+class SpeechEngine:
+    def __init__(self, api_token=None, chunk_size=DEFAULT_CHUNK_SIZE, cache=None,
+                 retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, scheduler=None, check_cancelled=None):
+        self.api_token = api_token or os.environ.get("REPLICATE_API_TOKEN")
+        self.chunk_size = chunk_size
+        self.cache = cache
+        self.retries = retries
+        self.backoff = backoff
+        self.scheduler = scheduler
+        # 每次发起 API 调用前 (包括在调度器里排队时) 和下载的每个数据块前调用，抛出异常即放弃
+        self.check_cancelled = check_cancelled
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            if self.api_token:
+                self._client = get_replicate_client(self.api_token)
+            else:
+                import replicate
+                self._client = replicate
+        return self._client
+
+    def _run_model(self, params):
+        with METRICS.timer("api_call"):
+            output = self.client.run(MODEL_NAME, input=params)
+        return getattr(output, "url", output)
+
+    def call_api(self, params, priority=False):
+        if self.scheduler is not None:
+            return self.scheduler.call(self._run_model, params, priority=priority,
+                                       check_cancelled=self.check_cancelled)
+        attempt = 0
+        while True:
+            if self.check_cancelled is not None:
+                self.check_cancelled()
+            try:
+                return self._run_model(params)
+            except Exception as e:
+                if attempt >= self.retries or not is_transient_api_error(e):
+                    raise
+                time.sleep(backoff_delay(attempt, self.backoff))
+                attempt += 1
+
+    def download(self, output_url, dest, on_chunk=None, on_progress=None):
+        return download_with_resume(output_url, dest, chunk_size=self.chunk_size, retries=self.retries,
+                                    backoff=self.backoff, on_chunk=on_chunk, on_progress=on_progress,
+                                    check_cancelled=self.check_cancelled)
+
+    def synthesize(self, params, dest, priority=False):
+        validate_text(params.get("text", ""))
+        if self.cache is not None:
+            with METRICS.timer("cache_fetch"):
+                hit = self.cache.fetch(params, dest)
+            if hit:
+                return dest
+        output_url = self.call_api(params, priority)
+        self.download(output_url, dest)
+        if self.cache is not None:
+            with METRICS.timer("cache_write"):
+                self.cache.put(params, dest)
+        return dest
@@ -0,0 +1,272 @@
+import os
+import sys
+import json
+import argparse
+import threading
+from urllib.parse import parse_qsl, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import http_transport
+from audio_buffer import AudioBuffer
+from batch_synthesize import load_lang_data
+from metrics import METRICS
+from request_scheduler import DEFAULT_RATE, RequestScheduler
+from speech_engine import MODEL_NAME, SpeechEngine, build_params, validate_text
+from synthesis_cache import SynthesisCache
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 1024 * 1024
+AUDIO_CONTENT_TYPE = "audio/mpeg"
+
+
+class SharedResult:
+    """一次上游合成的结果，由所有相同的请求共享。
+
+    合成线程边下载边 publish()，读取方既可以等全部完成，也可以从头逐块读取。
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.finished = False
+        self.error = None
+        self.cache_hit = False
+        self._cond = threading.Condition()
+
+    def publish(self, chunk):
+        with self._cond:
+            self.chunks.append(bytes(chunk))
+            self._cond.notify_all()
+
+    def finish(self, error=None):
+        with self._cond:
+            self.finished = True
+            self.error = error
+            self._cond.notify_all()
+
+    def iter_chunks(self):
+        index = 0
+        while True:
+            with self._cond:
+                while index >= len(self.chunks) and not self.finished:
+                    self._cond.wait()
+                if self.error is not None:
+                    raise self.error
+                chunks = self.chunks[index:]
+                finished = self.finished
+            index += len(chunks)
+            yield from chunks
+            if finished and not chunks:
+                return
+
+    def wait(self):
+        with self._cond:
+            while not self.finished:
+                self._cond.wait()
+            if self.error is not None:
+                raise self.error
+            return b"".join(self.chunks)
+
+
+class SpeechService:
+    """无界面的合成服务：先查缓存，未命中时调用 API；参数相同的并发请求合并为一次上游调用 (singleflight)。"""
+
+    def __init__(self, api_token=None, cache=None, scheduler=None, lang_data=None):
+        self.engine = SpeechEngine(api_token=api_token, cache=None, scheduler=scheduler)
+        self.cache = cache
+        self.lang_data = lang_data or {}
+        self.requests = 0
+        self.upstream_calls = 0
+        self.coalesced = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def build_params(self, values):
+        params = build_params(str(values.get("text", "")), values, self.lang_data)
+        validate_text(params["text"])
+        return params
+
+    def request(self, params):
+        """返回 (SharedResult, 是否与进行中的请求合并)。"""
+        key = self.cache.key_for(params) if self.cache is not None else json.dumps(params, sort_keys=True)
+        with self._lock:
+            self.requests += 1
+            result = self._flights.get(key)
+            if result is not None:
+                self.coalesced += 1
+                return result, True
+            result = self._flights[key] = SharedResult()
+        threading.Thread(target=self._run, args=(key, params, result), name="speech-flight", daemon=True).start()
+        return result, False
+
+    def _run(self, key, params, result):
+        error = None
+        try:
+            path = self.cache.get(params) if self.cache is not None else None
+            if path is not None:
+                result.cache_hit = True
+                with open(path, "rb") as f:
+                    result.publish(f.read())
+            else:
+                with self._lock:
+                    self.upstream_calls += 1
+                output_url = self.engine.call_api(params)
+                buffer = AudioBuffer()
+                self.engine.download(output_url, buffer, on_chunk=result.publish)
+                if self.cache is not None:
+                    self.cache.put(params, buffer.finish())
+        except Exception as e:
+            error = e
+        finally:
+            # 先写入缓存再移除进行中的记录，之后到达的相同请求会直接命中缓存
+            with self._lock:
+                self._flights.pop(key, None)
+            result.finish(error)
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                "requests": self.requests,
+                "upstream_calls": self.upstream_calls,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._flights),
+            }
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        if self.engine.scheduler is not None:
+            stats["scheduler"] = self.engine.scheduler.stats()
+        return stats
+
+
+def make_handler(service):
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path == "/health":
+                self._send_json(200, {"status": "ok", "model": MODEL_NAME, **service.stats()})
+            elif url.path == "/metrics":
+                body = METRICS.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            elif url.path == "/synthesize":
+                self._synthesize(dict(parse_qsl(url.query)))
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            url = urlsplit(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            if url.path != "/synthesize" or length > MAX_BODY_BYTES:
+                # 请求体没有读取，连接上剩下的字节不能当成下一个请求解析
+                self.close_connection = True
+                if url.path != "/synthesize":
+                    self._send_json(404, {"error": "not found"})
+                    return
+                self._send_json(413, {"error": "request body too large"})
+                return
+            try:
+                values = json.loads(self.rfile.read(length) or b"{}")
+                if not isinstance(values, dict):
+                    raise ValueError("request body must be a JSON object")
+                for name, value in values.items():
+                    if not isinstance(value, (str, int, float)):
+                        raise TypeError(f"field {name!r} must be a string or a number")
+            except (TypeError, ValueError) as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            values.update(parse_qsl(url.query))
+            self._synthesize(values)
+
+        def _synthesize(self, values):
+            stream = str(values.pop("stream", "")).lower() in ("1", "true", "yes")
+            try:
+                params = service.build_params(values)
+            except (TypeError, ValueError) as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            result, coalesced = service.request(params)
+
+            if not stream:
+                try:
+                    data = result.wait()
+                except Exception as e:
+                    self._send_json(502, {"error": str(e)})
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", AUDIO_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("X-Cache", "hit" if result.cache_hit else "miss")
+                self.send_header("X-Coalesced", "1" if coalesced else "0")
+                self.end_headers()
+                self.wfile.write(data)
+                return
+
+            # 流式返回：分块传输，上游下载到一块就转发一块
+            self.send_response(200)
+            self.send_header("Content-Type", AUDIO_CONTENT_TYPE)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.send_header("X-Coalesced", "1" if coalesced else "0")
+            self.end_headers()
+            try:
+                for chunk in result.iter_chunks():
+                    self.wfile.write(f"{len(chunk):X}\r\n".encode("ascii") + chunk + b"\r\n")
+                self.wfile.write(b"0\r\n\r\n")
+            except Exception:
+                # 响应头已经发出，只能断开连接让客户端知道出错了
+                self.close_connection = True
+
+    return _Handler
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Minimax Speech-02-HD 本地 HTTP 合成服务")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="监听地址")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="监听端口")
+    parser.add_argument("--lang", help="用于解析显示名的语言文件，例如 zh_CN")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="每秒最多发起的 API 请求数 (0 为不限)")
+    parser.add_argument("--cache-dir", default="synthesis_cache", help="合成结果缓存目录")
+    parser.add_argument("--no-cache", action="store_true", help="不使用缓存")
+    parser.add_argument("--api-key", help="Replicate API 密钥，默认读取 REPLICATE_API_TOKEN")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    api_key = args.api_key or os.environ.get("REPLICATE_API_TOKEN")
+    if not api_key:
+        print("错误：未提供 API 密钥 (--api-key 或 REPLICATE_API_TOKEN)")
+        return 2
+
+    http_transport.configure()
+    cache = None if args.no_cache else SynthesisCache(args.cache_dir, model_name=MODEL_NAME)
+    service = SpeechService(api_key, cache, RequestScheduler(rate=args.rate), load_lang_data(args.lang))
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    server.daemon_threads = True
+    print(f"合成服务已启动: http://{args.host}:{server.server_address[1]}/synthesize")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
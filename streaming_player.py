@@ -0,0 +1,147 @@
+import io
+import threading
+from collections import deque
+
+from mp3_utils import audio_frames, iter_frames, skip_id3v2
+
+DEFAULT_PREBUFFER_BYTES = 24 * 1024
+STREAM_CHUNK_SIZE = 16 * 1024
+MAX_SEGMENT_BYTES = 512 * 1024
+MAX_FRAME_BYTES = 1441
+MAX_READY_SEGMENTS = 2
+
+
+class StreamingPlayer:
+    """边下载边播放：下载线程调用 feed()，Tk 主线程定时调用 poll()。
+
+    已下载的数据按完整的 MP3 帧切成片段，由后台线程转成 pygame Sound，主线程只负责排入同一个声道。
+    首个片段只需要 prebuffer_bytes，之后的片段逐步加倍以减少接缝。
+    最多提前解码 MAX_READY_SEGMENTS 个片段，切出的数据随即从缓冲区删除。
+    """
+
+    def __init__(self, prebuffer_bytes=DEFAULT_PREBUFFER_BYTES, max_segment_bytes=MAX_SEGMENT_BYTES):
+        self.prebuffer_bytes = prebuffer_bytes
+        self.max_segment_bytes = max_segment_bytes
+        self._buffer = bytearray()
+        self._finished = False
+        self._stopped = False
+        self._started = False
+        self._decoded_all = False
+        self._error = None
+        self._tag_skipped = False
+        self._segment_bytes = prebuffer_bytes
+        self._ready = deque()
+        self._channel = None
+        self._decoder = None
+        self._cond = threading.Condition()
+
+    def feed(self, chunk):
+        with self._cond:
+            if not self._stopped:
+                self._buffer += chunk
+                self._cond.notify()
+
+    def finish(self):
+        with self._cond:
+            self._finished = True
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._ready.clear()
+            self._buffer.clear()
+            self._cond.notify()
+        if self._channel is not None:
+            self._channel.stop()
+
+    @property
+    def started(self):
+        return self._started
+
+    def _segment_window(self):
+        """持有锁时调用：可以切下一段时返回 (窗口数据, 是否已下载完)，否则返回 None。"""
+        if len(self._ready) >= MAX_READY_SEGMENTS:
+            return None
+        finished = self._finished
+        if not self._tag_skipped:
+            skip = skip_id3v2(self._buffer)
+            if skip > len(self._buffer) and not finished:
+                return None
+            del self._buffer[:skip]
+            self._tag_skipped = True
+        if len(self._buffer) < self._segment_bytes and not finished:
+            return None
+        # 只复制这一段需要的窗口，不必每次复制全部未播放的数据
+        return bytes(self._buffer[:self._segment_bytes + MAX_FRAME_BYTES]), finished
+
+    def _decode(self):
+        import pygame
+
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopped or (self._finished and not self._buffer):
+                        self._decoded_all = True
+                        return
+                    taken = self._segment_window()
+                    if taken is not None:
+                        break
+                    self._cond.wait()
+                window, finished = taken
+
+            # 在锁外查找帧边界，主线程的 poll 不必等待
+            end = 0
+            for offset, header in iter_frames(window):
+                end = offset + header["length"]
+                if end >= self._segment_bytes:
+                    break
+            with self._cond:
+                if end:
+                    del self._buffer[:end]
+                    self._segment_bytes = min(self._segment_bytes * 2, self.max_segment_bytes)
+                elif finished:
+                    self._buffer.clear()
+                else:
+                    # 窗口里没有完整的帧，前面的字节不可能再属于任何一帧
+                    del self._buffer[:max(0, len(window) - MAX_FRAME_BYTES)]
+            segment = audio_frames(window[:end]) if end else b""
+            if not segment:
+                continue
+            try:
+                sound = pygame.mixer.Sound(file=io.BytesIO(segment))
+            except pygame.error as e:
+                with self._cond:
+                    self._error = e
+                    self._decoded_all = True
+                return
+            with self._cond:
+                if not self._stopped:
+                    self._ready.append(sound)
+
+    def poll(self):
+        """推进播放，仍在下载或播放时返回 True；解码出错时抛出 pygame.error。"""
+        if self._stopped:
+            return False
+        if self._decoder is None:
+            # 调用方在第一次 poll 之前已经初始化了 mixer
+            self._decoder = threading.Thread(target=self._decode, name="stream-decode", daemon=True)
+            self._decoder.start()
+        if self._error is not None:
+            raise self._error
+
+        with self._cond:
+            if self._ready:
+                if self._channel is None:
+                    import pygame
+
+                    self._channel = pygame.mixer.find_channel(True)
+                if not self._channel.get_busy():
+                    self._channel.play(self._ready.popleft())
+                    self._started = True
+                elif self._channel.get_queue() is None:
+                    self._channel.queue(self._ready.popleft())
+                self._cond.notify()
+            drained = self._decoded_all and not self._ready
+        busy = self._channel is not None and self._channel.get_busy()
+        return not (drained and not busy)
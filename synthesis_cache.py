@@ -0,0 +1,136 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+
+from audio_buffer import open_output
+
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+CACHE_SUFFIX = ".mp3"
+
+
+def params_hash(params, model_name=None):
+    payload = {"model": model_name, "input": params} if model_name else params
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class SynthesisCache:
+    """以最终 params 的哈希为键的磁盘缓存，超出字节预算时按 LRU 淘汰。"""
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_CACHE_BYTES, model_name=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.model_name = model_name
+        self.hits = 0
+        self.misses = 0
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        found = []
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith(CACHE_SUFFIX):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, filename))
+            except OSError:
+                continue
+            found.append((st.st_mtime, filename[:-len(CACHE_SUFFIX)], st.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self.total_bytes += size
+        self._evict()
+
+    def key_for(self, params):
+        return params_hash(params, self.model_name)
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, key + CACHE_SUFFIX)
+
+    def get(self, params):
+        key = self.key_for(params)
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            path = self.path_for(key)
+            if not os.path.exists(path):
+                self.total_bytes -= self._entries.pop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def fetch(self, params, dest):
+        path = self.get(params)
+        if path is None:
+            return False
+        with open(path, "rb") as src, open_output(dest) as out:
+            out.write(src.read())
+        return True
+
+    def put(self, params, src):
+        """src 可以是文件路径、bytes 或 AudioBuffer。"""
+        key = self.key_for(params)
+        path = self.path_for(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        if hasattr(src, "save"):
+            src.save(tmp_path)
+        elif isinstance(src, (bytes, bytearray, memoryview)):
+            with open(tmp_path, "wb") as f:
+                f.write(src)
+        else:
+            shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+        with self._lock:
+            self.total_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._evict()
+        return path
+
+    def discard(self, params):
+        """删除一条缓存 (例如校验发现它已损坏)，返回是否存在。"""
+        key = self.key_for(params)
+        with self._lock:
+            size = self._entries.pop(key, None)
+            if size is None:
+                return False
+            self.total_bytes -= size
+        try:
+            os.remove(self.path_for(key))
+        except OSError:
+            pass
+        return True
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+            }